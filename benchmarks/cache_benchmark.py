@@ -0,0 +1,43 @@
+"""
+Micro-benchmark for the rate limiter store (src.cache.TTLLRUStore).
+
+Fills the store with N keys and then measures the mean latency of a mixed
+get/set workload on random keys. Per-op latency should stay flat as N grows.
+
+    python -m benchmarks.cache_benchmark
+"""
+from src.cache import TTLLRUStore
+import random
+import time
+
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+OPS = 200_000
+
+
+def run(num_keys: int) -> float:
+    store = TTLLRUStore(max_size_bytes=1024 * 1024 * 1024)
+    keys = [f"rate_limit:10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in range(num_keys)]
+    for key in keys:
+        store.set(key, 1, 60)
+
+    rng = random.Random(42)
+    sample = [rng.choice(keys) for _ in range(OPS)]
+
+    start = time.perf_counter()
+    for key in sample:
+        current = store.get(key)
+        store.set(key, (current or 0) + 1, 60)
+    elapsed = time.perf_counter() - start
+
+    return elapsed / (OPS * 2) * 1e9
+
+
+def main():
+    print(f"{'keys':>10} | {'ns/op':>8}")
+    for n in SIZES:
+        print(f"{n:>10} | {run(n):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
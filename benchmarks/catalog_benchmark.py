@@ -0,0 +1,53 @@
+"""
+Micro-benchmark for the autocomplete index (src.catalog.CatalogIndex).
+
+Loads N synthetic manga titles and measures the mean latency of prefix
+queries of different selectivity. Latency should stay flat as N grows,
+since a query reads at most `limit` matches after one bisect.
+
+    python -m benchmarks.catalog_benchmark
+"""
+from src.catalog import CatalogIndex
+import random
+import time
+
+
+SIZES = [1_000, 10_000, 100_000]
+QUERIES = ["dra", "shadow aca", "kni", "zzz"]
+OPS = 5_000
+
+WORDS = [
+    "dragon", "shadow", "academy", "isekai", "tensei", "sword", "demon",
+    "king", "love", "school", "magic", "hero", "slime", "tower", "blade",
+    "moon", "lord", "ghost", "night", "sky", "queen", "knight", "witch"
+]
+
+
+def run(num_titles: int) -> tuple:
+    rng = random.Random(42)
+    titles = {
+        i: " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))) + f" {i}"
+        for i in range(num_titles)
+    }
+    index = CatalogIndex()
+    start = time.perf_counter()
+    index.sync("manga", titles)
+    load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(OPS):
+        index.search(QUERIES[i % len(QUERIES)], 10)
+    query = (time.perf_counter() - start) / OPS * 1e6
+
+    return load * 1000, query
+
+
+def main():
+    print(f"{'titles':>10} | {'load ms':>8} | {'us/query':>8}")
+    for n in SIZES:
+        load, query = run(n)
+        print(f"{n:>10} | {load:>8.0f} | {query:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
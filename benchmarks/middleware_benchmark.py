@@ -0,0 +1,149 @@
+"""
+Benchmark of the per-request middleware cost on `GET /`.
+
+Compares the old `@app.middleware("http")` implementation (Starlette's
+BaseHTTPMiddleware) with the pure ASGI stack of src.middleware. Both apps
+are called in-process through ASGI, with no server or network involved, so
+the numbers reflect the middleware overhead only.
+
+    python -m benchmarks.middleware_benchmark
+"""
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from src import middleware
+from src import ratelimit
+from src import util
+from src.constants import Constants
+from src.monitor import get_monitor
+import asyncio
+import statistics
+import time
+
+
+REQUESTS = 20_000
+CONCURRENCY = 64
+
+
+def add_security_headers(request: Request, response) -> None:
+    # The per-response header construction replaced by src.middleware
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    response.headers["X-Frame-Options"] = "DENY"
+    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+    response.headers["Permissions-Policy"] = Constants.PERMISSIONS_POLICY_HEADER
+    if Constants.IS_PRODUCTION:
+        response.headers["Strict-Transport-Security"] = ("max-age=31536000; includeSubDomains; preload")
+    response.headers["Content-Security-Policy"] = (
+        "default-src 'none'; "
+        "frame-ancestors 'none';"
+    )
+    if any(request.url.path.startswith(path) for path in Constants.SENSITIVE_PATHS):
+        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
+        response.headers["Pragma"] = "no-cache"
+        response.headers["Expires"] = "0"
+    elif request.url.path.startswith("/static/"):
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+
+
+def before_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    def read_root():
+        return { "status": "ok" }
+
+    @app.middleware("http")
+    async def http_middleware(request: Request, call_next):
+        start_time = time.perf_counter()
+        identifier = util.get_client_identifier(request)
+        limiter = ratelimit.get_rate_limiter(request.url.path)
+        allowed, remaining, reset_at = await limiter.hit(identifier)
+        reset_after = str(ratelimit.seconds_until_reset(reset_at))
+        if not allowed:
+            return JSONResponse({"detail": "Too many requests"}, status_code=429)
+
+        response = await call_next(request)
+        response.headers["X-RateLimit-Limit"] = str(limiter.limit)
+        response.headers["X-RateLimit-Remaining"] = str(remaining)
+        response.headers["X-RateLimit-Reset"] = reset_after
+        add_security_headers(request, response)
+        response_time_ms = (time.perf_counter() - start_time) * 1000
+        response.headers["X-Response-Time"] = f"{response_time_ms:.2f}ms"
+        get_monitor().increment_request(response_time_ms)
+        return response
+
+    return app
+
+
+def after_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    def read_root():
+        return { "status": "ok" }
+
+    app.add_middleware(middleware.RateLimitMiddleware)
+    app.add_middleware(middleware.SecurityHeadersMiddleware)
+    app.add_middleware(middleware.TimingMiddleware)
+    return app
+
+
+async def request(app, client: int) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        # One client per coroutine keeps the rate limiter out of the way
+        "client": (f"10.0.{client >> 8 & 255}.{client & 255}", 1234),
+        "server": ("localhost", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def latency(app) -> list:
+    samples = []
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        await request(app, i % 1024)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return sorted(samples)
+
+
+async def throughput(app) -> float:
+    async def worker(client: int):
+        for _ in range(REQUESTS // CONCURRENCY):
+            await request(app, client)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(CONCURRENCY)))
+    return (REQUESTS // CONCURRENCY * CONCURRENCY) / (time.perf_counter() - start)
+
+
+async def main():
+    print(f"{'stack':>8} | {'p50 µs':>8} | {'p99 µs':>8} | {'req/s':>8}")
+    for name, app in (("before", before_app()), ("after", after_app())):
+        await latency(app)  # warm up
+        samples = await latency(app)
+        p50 = statistics.median(samples)
+        p99 = samples[int(len(samples) * 0.99)]
+        rps = await throughput(app)
+        print(f"{name:>8} | {p50:>8.0f} | {p99:>8.0f} | {rps:>8.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
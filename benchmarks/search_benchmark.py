@@ -0,0 +1,137 @@
+"""
+Benchmark of manga search over a synthetic 100k-manga catalog.
+
+Compares the old search (`title ILIKE '%q%'` with a `SELECT DISTINCT` join on
+manga_genres, counted with `COUNT(DISTINCT (m.*))`) against the ranked
+search of src.models.search. The catalog is generated inside a throwaway
+`search_bench` schema of the DATABASE_URL database and dropped at the end.
+
+    python -m benchmarks.search_benchmark
+"""
+from dotenv import load_dotenv
+from src.models import search as search_model
+import asyncpg
+import asyncio
+import time
+import os
+
+
+NUM_MANGAS = 100_000
+NUM_AUTHORS = 20_000
+NUM_GENRES = 40
+RUNS = 20
+
+QUERIES = ["dragon", "shadow academy", "isekai tensei", "lo"]
+GENRES = [[3], [3, 7], [3, 7, 11]]
+
+
+SETUP = f"""
+    DROP SCHEMA IF EXISTS search_bench CASCADE;
+    CREATE SCHEMA search_bench;
+    SET search_path = search_bench, public;
+
+    CREATE TABLE mangas (
+        id BIGINT PRIMARY KEY,
+        title CITEXT NOT NULL UNIQUE,
+        descr TEXT,
+        cover_image_url TEXT NOT NULL,
+        status TEXT NOT NULL,
+        color TEXT NOT NULL,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        mal_url TEXT
+    );
+    CREATE TABLE authors (id BIGINT PRIMARY KEY, name TEXT NOT NULL);
+    CREATE TABLE manga_authors (
+        author_id BIGINT NOT NULL,
+        manga_id BIGINT NOT NULL,
+        PRIMARY KEY (author_id, manga_id)
+    );
+    CREATE TABLE manga_genres (
+        genre_id BIGINT NOT NULL,
+        manga_id BIGINT NOT NULL,
+        PRIMARY KEY (genre_id, manga_id)
+    );
+
+    CREATE TEMP TABLE words AS
+    SELECT w, row_number() OVER () AS i FROM unnest(ARRAY[
+        'dragon', 'shadow', 'academy', 'isekai', 'tensei', 'sword', 'demon',
+        'king', 'love', 'school', 'magic', 'hero', 'slime', 'tower', 'blade',
+        'moon', 'lord', 'ghost', 'night', 'sky', 'queen', 'knight', 'witch'
+    ]) w;
+
+    INSERT INTO mangas (id, title, descr, cover_image_url, status, color)
+    SELECT
+        g,
+        (SELECT string_agg(w, ' ') FROM words WHERE i IN (1 + g % 23, 1 + (g / 23) % 23, 1 + (g / 529) % 23)) || ' ' || g,
+        (SELECT string_agg(w, ' ') FROM words WHERE i % 4 = g % 4) || ' ' || repeat('lorem ipsum ', 20),
+        'https://example.com/' || g || '.jpg',
+        'Ongoing',
+        '#000000'
+    FROM generate_series(1, {NUM_MANGAS}) g;
+
+    INSERT INTO authors (id, name)
+    SELECT g, (SELECT w FROM words WHERE i = 1 + g % 23) || ' author ' || g
+    FROM generate_series(1, {NUM_AUTHORS}) g;
+
+    INSERT INTO manga_authors (author_id, manga_id)
+    SELECT 1 + (g * 7919) % {NUM_AUTHORS}, g FROM generate_series(1, {NUM_MANGAS}) g;
+
+    INSERT INTO manga_genres (genre_id, manga_id)
+    SELECT DISTINCT 1 + (g * k * 31) % {NUM_GENRES}, g
+    FROM generate_series(1, {NUM_MANGAS}) g, generate_series(1, 4) k;
+
+    CREATE INDEX ON manga_genres (manga_id);
+    CREATE INDEX ON mangas USING gin(title gin_trgm_ops);
+    CREATE INDEX ON mangas USING gin(descr gin_trgm_ops);
+    CREATE INDEX ON authors USING gin(name gin_trgm_ops);
+    ANALYZE;
+"""
+
+
+async def old_search(conn: asyncpg.Connection, q: str, genre_id: int) -> None:
+    where_clause = "WHERE m.title ILIKE $1 AND mg.genre_id = $2"
+    await conn.fetchval(
+        f"SELECT COUNT(DISTINCT (m.*)) FROM mangas m JOIN manga_genres mg ON mg.manga_id = m.id {where_clause}",
+        f"%{q}%", genre_id
+    )
+    await conn.fetch(
+        f"""
+            SELECT DISTINCT id, title, descr, status, color, cover_image_url, mal_url, updated_at, created_at
+            FROM mangas m JOIN manga_genres mg ON mg.manga_id = m.id
+            {where_clause}
+            ORDER BY m.title ASC LIMIT 64 OFFSET 0
+        """,
+        f"%{q}%", genre_id
+    )
+
+
+async def timed(fn) -> float:
+    await fn()
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        await fn()
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+async def main():
+    load_dotenv()
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
+    try:
+        print(f"building synthetic catalog ({NUM_MANGAS} mangas)...")
+        await conn.execute(SETUP)
+
+        print(f"{'query':>16} | {'genres':>10} | {'old ms':>8} | {'ranked all':>10} | {'ranked any':>10}")
+        for q in QUERIES:
+            for genres in GENRES:
+                old = await timed(lambda: old_search(conn, q, genres[0])) if len(genres) == 1 else float('nan')
+                ranked_all = await timed(lambda: search_model.search_mangas(q, genres, 'all', 64, 0, conn))
+                ranked_any = await timed(lambda: search_model.search_mangas(q, genres, 'any', 64, 0, conn))
+                print(f"{q:>16} | {str(genres):>10} | {old:>8.2f} | {ranked_all:>10.2f} | {ranked_any:>10.2f}")
+    finally:
+        await conn.execute("DROP SCHEMA IF EXISTS search_bench CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Cold-start cost of the database initialization of one worker.
+
+"before": what db_init used to do, executing the whole schema file (the
+baseline migration) on every start. "after": schema_migrations.migrate on an
+up-to-date database, i.e. a single version check. Each run opens its own
+connection, like a fresh worker. Runs against DATABASE_URL; the schema file
+is idempotent, but use a development database.
+
+    python -m benchmarks.startup_benchmark
+"""
+from dotenv import load_dotenv
+from src import schema_migrations
+import asyncpg
+import asyncio
+import time
+import os
+
+
+RUNS = 10
+
+
+async def before(database_url: str) -> None:
+    conn = await asyncpg.connect(database_url)
+    try:
+        _, _, baseline = schema_migrations.list_migrations()[0]
+        await conn.execute(baseline.read_text(encoding="utf-8"))
+    finally:
+        await conn.close()
+
+
+async def after(database_url: str) -> None:
+    conn = await asyncpg.connect(database_url)
+    try:
+        await schema_migrations.migrate(conn)
+    finally:
+        await conn.close()
+
+
+async def timed(fn, database_url: str) -> float:
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        await fn(database_url)
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+async def main():
+    load_dotenv()
+    database_url = os.getenv("DATABASE_URL")
+    # Brings the database up to date so "after" measures the fast path
+    await after(database_url)
+
+    print(f"{'startup':>8} | {'ms':>8}")
+    print(f"{'before':>8} | {await timed(before, database_url):>8.1f}")
+    print(f"{'after':>8} | {await timed(after, database_url):>8.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
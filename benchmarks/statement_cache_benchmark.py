@@ -0,0 +1,77 @@
+"""
+Per-query latency with and without the asyncpg prepared statement cache.
+
+Runs the same read workload (catalog listings through the model functions)
+on two pools against DATABASE_URL, one with statement_cache_size=0 (the old
+setting, and the DB_PGBOUNCER mode) and one with DB_STATEMENT_CACHE_SIZE,
+and prints the mean latency of each statement as seen by the query logger.
+
+    python -m benchmarks.statement_cache_benchmark
+"""
+from asyncpg import create_pool
+from dotenv import load_dotenv
+from src.constants import Constants
+from src.db import QueryStats
+from src.models import manga as manga_model
+from src.models import chapter as chapter_model
+import asyncio
+import os
+
+
+ROUNDS = 200
+CONCURRENCY = 8
+
+
+async def workload(conn) -> None:
+    await manga_model.get_latest_mangas(64, 0, conn)
+    await manga_model.get_popular_mangas(64, 0, conn)
+    await manga_model.get_mangas(64, 0, conn, q="a")
+    await manga_model.get_mangas_complete(None, None, "ASC", 64, 0, conn)
+    await chapter_model.get_chapters(64, 0, conn)
+
+
+async def run(database_url: str, cache_size: int) -> QueryStats:
+    stats = QueryStats()
+
+    async def init(conn):
+        conn.add_query_logger(stats.record)
+
+    pool = await create_pool(
+        database_url,
+        min_size=CONCURRENCY,
+        max_size=CONCURRENCY,
+        statement_cache_size=cache_size,
+        init=init
+    )
+
+    async def worker(n: int):
+        for _ in range(n):
+            async with pool.acquire() as conn:
+                await workload(conn)
+
+    try:
+        # Warm-up round, not measured
+        await worker(1)
+        stats.reset()
+        await asyncio.gather(*(worker(ROUNDS // CONCURRENCY) for _ in range(CONCURRENCY)))
+    finally:
+        await pool.close()
+    return stats
+
+
+async def main():
+    load_dotenv()
+    database_url = os.getenv("DATABASE_URL")
+    without_cache = (await run(database_url, 0)).info(limit=100)
+    with_cache = (await run(database_url, Constants.DB_STATEMENT_CACHE_SIZE)).info(limit=100)
+
+    cached = {q["sql"]: q for q in with_cache["queries"]}
+    print(f"{'no cache ms':>12} | {'cache ms':>9} | sql")
+    for q in without_cache["queries"]:
+        other = cached.get(q["sql"])
+        print(f"{q['mean_ms']:>12.3f} | {other['mean_ms'] if other else float('nan'):>9.3f} | {q['sql'][:80]}")
+    print(f"{without_cache['mean_ms']:>12.3f} | {with_cache['mean_ms']:>9.3f} | all statements")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
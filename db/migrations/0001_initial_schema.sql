@@ -344,87 +344,309 @@ CREATE TABLE IF NOT EXISTS logs (
 ------------------------------------------------
 --                 [VIEWS]                    --
 ------------------------------------------------
-CREATE MATERIALIZED VIEW IF NOT EXISTS manga_page_view AS
+-- Dados da página de cada mangá, mantidos pelos triggers de refresh_manga_pages
+-- (mangas, chapters, manga_genres, manga_authors, genres e authors)
+CREATE TABLE IF NOT EXISTS manga_pages (
+    id BIGINT PRIMARY KEY,
+    title CITEXT NOT NULL,
+    descr TEXT,
+    status manga_status_enum NOT NULL,
+    color TEXT NOT NULL,
+    cover_image_url TEXT NOT NULL,
+    mal_url TEXT,
+    updated_at TIMESTAMPTZ NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    chapters JSONB NOT NULL DEFAULT '[]',
+    genres JSONB NOT NULL DEFAULT '[]',
+    authors JSONB NOT NULL DEFAULT '[]',
+    FOREIGN KEY (id) REFERENCES mangas(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+-- manga_page_view era uma materialized view com REFRESH periódico
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_matviews WHERE matviewname = 'manga_page_view') THEN
+        DROP MATERIALIZED VIEW manga_page_view;
+    END IF;
+END$$;
+
+DROP FUNCTION IF EXISTS perform_refresh_manga_page_view();
+
+-- As views vêm de manga_metrics na leitura, para que cada flush do contador
+-- de visualizações não reescreva as páginas
+CREATE OR REPLACE VIEW manga_page_view AS
 SELECT
-    m.id,
-    m.title,
-    m.descr,
-    m.status,
-    m.color,
-    m.cover_image_url,
-    m.mal_url,
-    m.updated_at,
-    m.created_at,
-
-    COALESCE(
-        (
-            SELECT
-                total_reads
-            FROM
-                manga_metrics
-            WHERE
-                manga_metrics.manga_id = m.id
-        ),
-        0::BIGINT
-    ) as views,
-
-    COALESCE(
-        (
-            SELECT json_agg(jsonb_build_object(
-                'id', c.id,
-                'chapter_name', c.chapter_name
-            ) ORDER BY c.chapter_index)
-            FROM chapters c
-            WHERE c.manga_id = m.id
-        ),
-        '[]'
-    ) AS chapters,
-
-    COALESCE(
-        (
-            SELECT json_agg(jsonb_build_object(
-                'id', g.id,
-                'genre', g.genre,
-                'created_at', g.created_at
-            ))
-            FROM manga_genres mg
-            JOIN genres g ON g.id = mg.genre_id
-            WHERE mg.manga_id = m.id
-        ),
-        '[]'
-    ) AS genres,
-
-    COALESCE(
-        (
-            SELECT json_agg(jsonb_build_object(
-                'author_id', a.id,
-                'author_name', a.name,
-                'role', ma.role
-            ))
-            FROM manga_authors ma
-            JOIN authors a ON a.id = ma.author_id
-            WHERE ma.manga_id = m.id
-        ),
-        '[]'
-    ) AS authors
+    p.id,
+    p.title,
+    p.descr,
+    p.status,
+    p.color,
+    p.cover_image_url,
+    p.mal_url,
+    p.updated_at,
+    p.created_at,
+    COALESCE(mm.total_reads, 0::BIGINT) AS views,
+    p.chapters,
+    p.genres,
+    p.authors
+FROM
+    manga_pages p
+LEFT JOIN
+    manga_metrics mm ON mm.manga_id = p.id;
+
+------------------------------------------------
+--                 [ROW COUNTS]               --
+------------------------------------------------
+
+-- Contagem exata de linhas por tabela, mantida por triggers (ver db.db_count)
+CREATE TABLE IF NOT EXISTS table_row_counts (
+    table_name TEXT PRIMARY KEY,
+    row_count BIGINT NOT NULL
+);
+
+
+------------------------------------------------
+--             [CATALOG VERSION]              --
+------------------------------------------------
+
+-- Contador incrementado a cada escrita no catálogo; as tarefas periódicas
+-- (src/catalog.py, src/scheduler.py) só trabalham quando ele muda
+CREATE TABLE IF NOT EXISTS catalog_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    version BIGINT NOT NULL DEFAULT 0
+);
 
-FROM mangas m;
+INSERT INTO catalog_version (id, version) VALUES (TRUE, 0) ON CONFLICT (id) DO NOTHING;
+
+-- Última execução de cada tarefa do líder (src/scheduler.py)
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    name TEXT PRIMARY KEY,
+    catalog_version BIGINT,
+    last_run_at TIMESTAMPTZ,
+    last_duration_ms DOUBLE PRECISION
+);
 
-CREATE UNIQUE INDEX IF NOT EXISTS idx_manga_page_view_manga_id ON manga_page_view (id);
 
 ------------------------------------------------
 --               [TRIGGERS/FUNCTIONS]         --
 ------------------------------------------------
 
 
-CREATE OR REPLACE FUNCTION perform_refresh_manga_page_view()
+-- Recalcula as páginas dos mangás em manga_ids (todos quando NULL)
+CREATE OR REPLACE FUNCTION refresh_manga_pages(manga_ids BIGINT[])
 RETURNS void AS $$
 BEGIN
-    REFRESH MATERIALIZED VIEW CONCURRENTLY manga_page_view;
+    INSERT INTO manga_pages (
+        id, title, descr, status, color, cover_image_url, mal_url,
+        updated_at, created_at, chapters, genres, authors
+    )
+    SELECT
+        m.id,
+        m.title,
+        m.descr,
+        m.status,
+        m.color,
+        m.cover_image_url,
+        m.mal_url,
+        m.updated_at,
+        m.created_at,
+
+        COALESCE(
+            (
+                SELECT jsonb_agg(jsonb_build_object(
+                    'id', c.id,
+                    'chapter_name', c.chapter_name
+                ) ORDER BY c.chapter_index)
+                FROM chapters c
+                WHERE c.manga_id = m.id
+            ),
+            '[]'
+        ),
+
+        COALESCE(
+            (
+                SELECT jsonb_agg(jsonb_build_object(
+                    'id', g.id,
+                    'genre', g.genre,
+                    'created_at', g.created_at
+                ))
+                FROM manga_genres mg
+                JOIN genres g ON g.id = mg.genre_id
+                WHERE mg.manga_id = m.id
+            ),
+            '[]'
+        ),
+
+        COALESCE(
+            (
+                SELECT jsonb_agg(jsonb_build_object(
+                    'author_id', a.id,
+                    'author_name', a.name,
+                    'role', ma.role
+                ))
+                FROM manga_authors ma
+                JOIN authors a ON a.id = ma.author_id
+                WHERE ma.manga_id = m.id
+            ),
+            '[]'
+        )
+    FROM
+        mangas m
+    WHERE
+        manga_ids IS NULL OR m.id = ANY(manga_ids)
+    ON CONFLICT (id) DO UPDATE SET
+        title = EXCLUDED.title,
+        descr = EXCLUDED.descr,
+        status = EXCLUDED.status,
+        color = EXCLUDED.color,
+        cover_image_url = EXCLUDED.cover_image_url,
+        mal_url = EXCLUDED.mal_url,
+        updated_at = EXCLUDED.updated_at,
+        created_at = EXCLUDED.created_at,
+        chapters = EXCLUDED.chapters,
+        genres = EXCLUDED.genres,
+        authors = EXCLUDED.authors
+    -- Páginas que não mudaram não são reescritas
+    WHERE
+        (manga_pages.title, manga_pages.descr, manga_pages.status, manga_pages.color,
+         manga_pages.cover_image_url, manga_pages.mal_url, manga_pages.updated_at,
+         manga_pages.created_at, manga_pages.chapters, manga_pages.genres, manga_pages.authors)
+        IS DISTINCT FROM
+        (EXCLUDED.title, EXCLUDED.descr, EXCLUDED.status, EXCLUDED.color,
+         EXCLUDED.cover_image_url, EXCLUDED.mal_url, EXCLUDED.updated_at,
+         EXCLUDED.created_at, EXCLUDED.chapters, EXCLUDED.genres, EXCLUDED.authors);
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Triggers por statement: uma chamada de refresh_manga_pages por comando com
+-- os mangás afetados, lidos das transition tables
+CREATE OR REPLACE FUNCTION refresh_manga_pages_by_manga_id()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM refresh_manga_pages(ARRAY(SELECT DISTINCT manga_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_manga_pages(ARRAY(SELECT DISTINCT manga_id FROM old_rows));
+    ELSE
+        PERFORM refresh_manga_pages(ARRAY(
+            SELECT manga_id FROM new_rows UNION SELECT manga_id FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION refresh_manga_pages_of_mangas()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_pages(ARRAY(SELECT id FROM new_rows));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION refresh_manga_pages_of_genres()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_pages(ARRAY(
+        SELECT DISTINCT mg.manga_id FROM manga_genres mg JOIN new_rows n ON n.id = mg.genre_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION refresh_manga_pages_of_authors()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_manga_pages(ARRAY(
+        SELECT DISTINCT ma.manga_id FROM manga_authors ma JOIN new_rows n ON n.id = ma.author_id
+    ));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+-- Remoções de mangás, gêneros e autores chegam por ON DELETE CASCADE
+-- (manga_pages, manga_genres e manga_authors)
+CREATE OR REPLACE TRIGGER trg_manga_pages_insert AFTER INSERT ON mangas
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_of_mangas();
+
+CREATE OR REPLACE TRIGGER trg_manga_pages_update AFTER UPDATE ON mangas
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_of_mangas();
+
+CREATE OR REPLACE TRIGGER trg_manga_pages_update AFTER UPDATE ON genres
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_of_genres();
+
+CREATE OR REPLACE TRIGGER trg_manga_pages_update AFTER UPDATE ON authors
+REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_of_authors();
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['chapters', 'manga_genres', 'manga_authors'] LOOP
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_manga_pages_insert AFTER INSERT ON %I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_by_manga_id()', t
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_manga_pages_update AFTER UPDATE ON %I '
+            'REFERENCING NEW TABLE AS new_rows OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_by_manga_id()', t
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_manga_pages_delete AFTER DELETE ON %I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION refresh_manga_pages_by_manga_id()', t
+        );
+    END LOOP;
+
+    -- Carga inicial, feita uma única vez
+    IF NOT EXISTS (SELECT 1 FROM manga_pages) THEN
+        PERFORM refresh_manga_pages(NULL);
+    END IF;
+END$$;
+
+
+-- Incrementado uma vez por transação, no commit (trigger adiado): a linha de
+-- catalog_version só fica travada durante o commit, e o novo valor aparece
+-- junto com as linhas alteradas (uma sequence seria visível antes do commit)
+CREATE OR REPLACE FUNCTION bump_catalog_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Deferred row triggers fire once per changed row: only the first bumps
+    IF current_setting('catalog.version_bumped', TRUE) IS DISTINCT FROM 'on' THEN
+        PERFORM set_config('catalog.version_bumped', 'on', TRUE);
+        UPDATE catalog_version SET version = version + 1;
+    END IF;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'mangas', 'chapters', 'manga_genres', 'manga_authors', 'genres', 'authors',
+        'manga_blacklist'
+    ] LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS trg_catalog_version ON %I', t);
+        EXECUTE format(
+            'CREATE CONSTRAINT TRIGGER trg_catalog_version AFTER INSERT OR UPDATE OR DELETE ON %I '
+            'DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION bump_catalog_version()', t
+        );
+        -- TRUNCATE has no row triggers; it locks the whole table until commit anyway
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_catalog_version_truncate AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION bump_catalog_version()', t
+        );
+    END LOOP;
+END$$;
+
+
 CREATE OR REPLACE FUNCTION create_user_login_attempt()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -488,6 +710,70 @@ FOR EACH ROW
 EXECUTE FUNCTION set_comment_path();
 
 
+-- Triggers por statement: um UPDATE em table_row_counts por comando, com o
+-- número de linhas das transition tables
+CREATE OR REPLACE FUNCTION count_inserted_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_row_counts
+    SET row_count = row_count + (SELECT COUNT(*) FROM new_rows)
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION count_deleted_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_row_counts
+    SET row_count = row_count - (SELECT COUNT(*) FROM old_rows)
+    WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+CREATE OR REPLACE FUNCTION count_truncated_rows()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE table_row_counts SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'mangas', 'chapters', 'chapter_images', 'logs', 'genres', 'authors',
+        'manga_genres', 'manga_authors', 'collections', 'manga_blacklist',
+        'bug_reports', 'manga_requests', 'users'
+    ] LOOP
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_count_insert AFTER INSERT ON %I '
+            'REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_rows()', t
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_count_delete AFTER DELETE ON %I '
+            'REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_rows()', t
+        );
+        EXECUTE format(
+            'CREATE OR REPLACE TRIGGER trg_count_truncate AFTER TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION count_truncated_rows()', t
+        );
+        -- Contagem inicial feita uma única vez, na mesma transação dos triggers
+        IF NOT EXISTS (SELECT 1 FROM table_row_counts WHERE table_name = t) THEN
+            EXECUTE format(
+                'INSERT INTO table_row_counts (table_name, row_count) SELECT %L, COUNT(*) FROM %I', t, t
+            );
+        END IF;
+    END LOOP;
+END$$;
+
+
 ------------------------------------------------
 --                 [INDEXES]                  --
 ------------------------------------------------
@@ -507,12 +793,14 @@ CREATE INDEX IF NOT EXISTS idx_mangas_title ON mangas(title);
 CREATE INDEX IF NOT EXISTS idx_mangas_status ON mangas(status);
 CREATE INDEX IF NOT EXISTS idx_mangas_created_at ON mangas(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_mangas_updated_at ON mangas(updated_at DESC);
+CREATE INDEX IF NOT EXISTS idx_mangas_updated_at_id ON mangas(updated_at DESC, id DESC);
 
 -- AUTHORS
 CREATE INDEX IF NOT EXISTS idx_authors_name ON authors(name);
 
 -- LOGS
 CREATE INDEX IF NOT EXISTS idx_logs_created_at ON logs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_logs_created_at_id ON logs(created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_logs_level ON logs(level, created_at DESC);
 
 -- GENRES
@@ -526,6 +814,7 @@ CREATE INDEX IF NOT EXISTS idx_manga_genres_genre_id ON manga_genres(genre_id);
 CREATE INDEX IF NOT EXISTS idx_chapters_manga_id ON chapters(manga_id);
 CREATE INDEX IF NOT EXISTS idx_chapters_manga_chapter ON chapters(manga_id, chapter_index);
 CREATE INDEX IF NOT EXISTS idx_chapters_created_at ON chapters(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_chapters_created_at_id ON chapters(created_at DESC, id DESC);
 
 -- CHAPTER_IMAGES (aplicado em cada partição)
 CREATE INDEX IF NOT EXISTS idx_chapter_images_chapter_id_p0 ON chapter_images_p0(chapter_id);
@@ -558,15 +847,20 @@ CREATE INDEX IF NOT EXISTS idx_chapter_images_chapter_idx_p8 ON chapter_images_p
 CREATE INDEX IF NOT EXISTS idx_chapter_images_chapter_id_p9 ON chapter_images_p9(chapter_id);
 CREATE INDEX IF NOT EXISTS idx_chapter_images_chapter_idx_p9 ON chapter_images_p9(chapter_id, image_index);
 
+-- Keyset pagination of get_all_chapter_images (created on every partition)
+CREATE INDEX IF NOT EXISTS idx_chapter_images_created_at ON chapter_images(created_at DESC, chapter_id DESC, image_index DESC);
+
 -- LIBRARY
 CREATE INDEX IF NOT EXISTS idx_library_user_id ON library(user_id);
 CREATE INDEX IF NOT EXISTS idx_library_manga_id ON library(manga_id);
 CREATE INDEX IF NOT EXISTS idx_library_status ON library(reading_status);
 CREATE INDEX IF NOT EXISTS idx_library_user_manga ON library(user_id, manga_id);
 CREATE INDEX IF NOT EXISTS idx_library_updated ON library(updated_at DESC) WHERE updated_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_library_user_status_updated ON library(user_id, reading_status, updated_at DESC, id DESC);
 
 -- COLLECTIONS
 CREATE INDEX IF NOT EXISTS idx_collections_created_at ON collections(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_collections_title_id ON collections(title, id);
 
 -- COLLECTIONS_MANGAS
 CREATE INDEX IF NOT EXISTS idx_collections_mangas_manga_id ON collections_mangas(manga_id);
@@ -595,6 +889,3 @@ CREATE INDEX IF NOT EXISTS idx_mangas_descr_trgm ON mangas USING gin(descr gin_t
 
 -- Para busca de autores
 CREATE INDEX IF NOT EXISTS idx_authors_name_trgm ON authors USING gin(name gin_trgm_ops);
-
-
-SELECT perform_refresh_manga_page_view();
\ No newline at end of file
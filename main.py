@@ -1,6 +1,6 @@
 from fastapi import FastAPI, Request, status
-from fastapi.responses import FileResponse, Response
-from fastapi.exceptions import RequestValidationError, HTTPException
+from fastapi.responses import FileResponse
+from fastapi.exceptions import RequestValidationError
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.gzip import GZipMiddleware
 from fastapi.middleware.cors import CORSMiddleware
@@ -29,19 +29,22 @@ from src.routes import admin_chapters
 from src.routes import admin_bug_reports
 from src.routes import admin_manga_request
 from src.routes import admin_manga_blacklist
-from src.monitor import get_monitor, periodic_update
-from src.cache import RedisLikeCache
+from src.monitor import periodic_update
 from src import db
 from src import middleware
-from src import util
+from src import cache_server
+from src import catalog
+from src import view_counter
+from src import scheduler
+from src.models import manga as manga_model
+from src.cache_backends import close_cache_backend
 from src.cloudflare import CloudflareR2Bucket
 from src.models import log as log_model
-from src.models import manga as manga_model
 from src.constants import Constants
 import uvicorn
-import time
 import asyncio
 import contextlib
+import multiprocessing
 import os
 
 
@@ -57,32 +60,33 @@ else:
     ]
 
 
-async def background_refresh_task():
-    while True:
-        try:
-            pool = db.get_db_pool()
-            conn = await pool.acquire()
-            await manga_model.refresh_manga_page_view(conn)
-            print("[INFO] manga_page_view updated.")
-        except Exception as e:
-            print(f"[ERROR] Erro ao atualizar manga_page_view: {e}")
-        finally:
-            await pool.release(conn)
-        await asyncio.sleep(600)
-
-
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
     print(f"[Starting {Constants.API_NAME}]")
     # [PostgreSql INIT]
     await db.db_init()
 
+    # [Catalog index]
+    async with db.get_db_pool().acquire() as conn:
+        await catalog.refresh_catalog(conn)
+    print(f"[CATALOG] {len(catalog.get_catalog())} entries")
+    task_catalog = asyncio.create_task(catalog.periodic_catalog_refresh())
+
+    # [View counter]
+    task_views = asyncio.create_task(view_counter.periodic_view_flush())
+
+    # [Database tasks] run by a single worker, after catalog writes only
+    task_reconcile_pages = asyncio.create_task(
+        scheduler.periodic_leader_job(
+            "manga_pages_reconcile",
+            Constants.MANGA_PAGES_RECONCILE_INTERVAL,
+            manga_model.refresh_manga_page_view
+        )
+    )
+
     # [System Monitor Task]
     task = asyncio.create_task(periodic_update())
 
-    # [Database tasks]
-    task_refresh_manga_page_vuew = asyncio.create_task(background_refresh_task())
-
     # [Cloudflare]
     app.state.r2 = await CloudflareR2Bucket.get_instance()
     print("[CORS] [ORIGINS]", origins)
@@ -95,14 +99,31 @@ async def lifespan(app: FastAPI):
     with contextlib.suppress(asyncio.CancelledError):
         await task
 
+    # [Catalog index]
+    task_catalog.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task_catalog
+
     # [Database tasks]
-    task_refresh_manga_page_vuew.cancel()
+    task_reconcile_pages.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task_reconcile_pages
+
+    # [View counter] last flush, before the pool is closed
+    task_views.cancel()
     with contextlib.suppress(asyncio.CancelledError):
-        await task_refresh_manga_page_vuew
+        await task_views
+    try:
+        await view_counter.flush_views()
+    except Exception as e:
+        print(f"[ERROR] Erro ao gravar as visualizações pendentes: {e}")
 
     # [PostgreSql CLOSE]
     await db.db_close()
 
+    # [Cache backend]
+    await close_cache_backend()
+
     # [Cloudflare]
     if hasattr(app.state.r2, "close"):
         await app.state.r2.close()
@@ -168,82 +189,19 @@ app.include_router(admin_logs.router, prefix='/api/v1/admin/logs', tags=["admin_
 
 ########################## MIDDLEWARES ##########################
 
-app.add_middleware(GZipMiddleware, minimum_size=1000)
-
-
-@app.middleware("http")
-async def http_middleware(request: Request, call_next): 
-    if request.url.path in ["/docs", "/redoc", "/openapi.json"]:
-        response = await call_next(request)
-        return response
-    
-    start_time = time.perf_counter()
-    
-    # Body size check
-    content_length = request.headers.get("content-length")
-    if content_length:
-        if int(content_length) > Constants.MAX_BODY_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"Request entity too large. Max allowed: {Constants.MAX_BODY_SIZE} bytes"
-            )
-    else:
-        body = b""
-        async for chunk in request.stream():
-            body += chunk
-            if len(body) > Constants.MAX_BODY_SIZE:
-                raise HTTPException(
-                    status_code=413,
-                    detail=f"Request entity too large. Max allowed: {Constants.MAX_BODY_SIZE} bytes"
-                )
-        request._body = body
-    
-    # Rate limit check
-    identifier = util.get_client_identifier(request)
-    key = f"rate_limit:{identifier}"
-
-    cache = RedisLikeCache()
-
-    current = cache.get(key)
-    new_value = (current + 1) if current else 1
-
-    if new_value > Constants.MAX_REQUESTS:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail={
-                "error": "Too many requests",
-                "message": "Rate limit exceeded. Try again in 60 seconds.",
-                "retry_after": f"{Constants.WINDOW}",
-                "limit": Constants.MAX_REQUESTS,
-                "window": Constants.WINDOW
-            },
-            headers={
-                "Retry-After": f"{Constants.WINDOW}",
-                "X-RateLimit-Limit": str(Constants.MAX_REQUESTS),
-                "X-RateLimit-Remaining": "0",
-                "X-RateLimit-Reset": f"{Constants.WINDOW}"
-            }
-        )
+GZIP_MIN_SIZE = 1000
 
-    cache.set(key, new_value, Constants.WINDOW)
-    current = new_value
-    
-    # Headers
-    response: Response = await call_next(request)
-        
-    remaining = max(Constants.MAX_REQUESTS - current, 0)
-    response.headers["X-RateLimit-Limit"] = str(Constants.MAX_REQUESTS)
-    response.headers["X-RateLimit-Remaining"] = str(remaining)
-    response.headers["X-RateLimit-Reset"] = "60"
-        
-    middleware.add_security_headers(request, response)
-    response_time_ms = (time.perf_counter() - start_time) * 1000
-    response.headers["X-Response-Time"] = f"{response_time_ms:.2f}ms"
-    
-    # System Monitor
-    get_monitor().increment_request(response_time_ms)
-
-    return response
+# Inside GZip: ETags are computed from the identity body (gzip output embeds the time)
+app.add_middleware(middleware.ConditionalRequestMiddleware, gzip_minimum_size=GZIP_MIN_SIZE)
+
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_SIZE)
+
+app.add_middleware(middleware.BodyLimitMiddleware, max_body_size=Constants.MAX_BODY_SIZE)
+
+# Outermost first: TimingMiddleware, SecurityHeadersMiddleware, RateLimitMiddleware
+app.add_middleware(middleware.RateLimitMiddleware)
+app.add_middleware(middleware.SecurityHeadersMiddleware)
+app.add_middleware(middleware.TimingMiddleware)
 
 
 @app.exception_handler(StarletteHTTPException)
@@ -293,10 +251,14 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 
 if __name__ == "__main__":
+    if Constants.CACHE_BACKEND == "local":
+        # One cache server for all workers; dies with this process
+        multiprocessing.Process(target=cache_server.run, daemon=True).start()
+
     uvicorn.run(
         "main:app", 
         host="0.0.0.0", 
-        port=80, 
-        workers=4,
+        port=int(os.getenv("PORT", 80)), 
+        workers=int(os.getenv("WEB_CONCURRENCY", 4)),
         log_level="info"
     )
\ No newline at end of file
@@ -1,19 +1,162 @@
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from threading import Lock
 from threading import RLock
 from src.util import singleton
+from src.constants import Constants
+from src import db
+from asyncpg import Connection
+from fastapi import Request
+from fastapi.responses import Response
 from pydantic import BaseModel
-from typing import Callable, TypeVar, Any, Type, Optional
+from typing import Awaitable, Callable, Dict, Iterable, NamedTuple, Set, Tuple, Union, Any, Optional
+from functools import wraps
+from urllib.parse import urlencode
+from string import Formatter
+import asyncio
+import inspect
+import hashlib
+import gzip
 import pickle
 import time
 import sys
 
 
+# Values of these types are stored as-is; anything else is pickled so the
+# cached object cannot be mutated by the caller after `set`.
+_INLINE_TYPES = (int, float, bool, str, bytes, type(None))
+
+
+class TTLLRUStore:
+    """
+    Key/value store with per-key TTL and LRU eviction by size.
+
+    Recency is tracked by an OrderedDict and expirations by a timer wheel of
+    one-second buckets that is drained lazily, so get, set and eviction are
+    amortized O(1) regardless of the number of keys. Not thread-safe; callers
+    hold their own lock.
+    """
+
+    ENTRY_OVERHEAD = 64
+
+    def __init__(self, max_size_bytes: int):
+        self.max_size_bytes = max_size_bytes
+        self.current_size = 0
+        # key -> [value, expires, size, pickled]
+        self._data: OrderedDict = OrderedDict()
+        # second -> keys expiring during that second. Keys whose entry was
+        # overwritten or evicted in the meantime are skipped when drained.
+        self._wheel: dict = {}
+        self._wheel_items = 0
+        self._next_tick = int(time.monotonic())
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.current_size -= entry[2]
+
+    def _schedule(self, key, expires: float) -> None:
+        self._wheel.setdefault(int(expires) + 1, []).append(key)
+        self._wheel_items += 1
+
+    def _purge_expired(self, now: float) -> None:
+        now_tick = int(now)
+        if now_tick < self._next_tick:
+            return
+
+        if now_tick - self._next_tick > len(self._wheel):
+            # Idle for longer than there are buckets: visit only the due ones
+            ticks = sorted(t for t in self._wheel if t <= now_tick)
+        else:
+            ticks = range(self._next_tick, now_tick + 1)
+
+        for tick in ticks:
+            keys = self._wheel.pop(tick, None)
+            if keys is None:
+                continue
+            self._wheel_items -= len(keys)
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and entry[1] <= now:
+                    self._remove(key)
+
+        self._next_tick = now_tick + 1
+
+    def _compact_wheel(self) -> None:
+        # Overwrites leave stale keys behind in the wheel; rebuild once they
+        # outnumber live keys so the wheel stays O(len(self)).
+        self._wheel = {}
+        self._wheel_items = 0
+        for key, entry in self._data.items():
+            self._schedule(key, entry[1])
+
+    def _evict_lru_until_fit(self) -> None:
+        while self.current_size > self.max_size_bytes and self._data:
+            _, entry = self._data.popitem(last=False)
+            self.current_size -= entry[2]
+
+    def set(self, key, value, ttl_seconds: float) -> None:
+        now = time.monotonic()
+        self._purge_expired(now)
+
+        if isinstance(value, _INLINE_TYPES):
+            stored, pickled = value, False
+            size = sys.getsizeof(value)
+        else:
+            stored, pickled = pickle.dumps(value), True
+            size = len(stored)
+        size += sys.getsizeof(key) + self.ENTRY_OVERHEAD
+
+        self._remove(key)
+        expires = now + ttl_seconds
+        self._data[key] = [stored, expires, size, pickled]
+        self.current_size += size
+
+        self._schedule(key, expires)
+        if self._wheel_items > 2 * len(self._data) + 1024:
+            self._compact_wheel()
+
+        self._evict_lru_until_fit()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        self._purge_expired(now)
+
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+
+        if entry[1] <= now:
+            self._remove(key)
+            return default
+
+        self._data.move_to_end(key)
+        return pickle.loads(entry[0]) if entry[3] else entry[0]
+
+    def ttl(self, key) -> float:
+        """Seconds until `key` expires, or 0 if it is missing."""
+        entry = self._data.get(key)
+        if entry is None:
+            return 0
+        return max(entry[1] - time.monotonic(), 0)
+
+    def delete(self, key) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._wheel.clear()
+        self._wheel_items = 0
+        self.current_size = 0
+
+
 class RedisLikeCache:
     _instance = None
     _lock = RLock()
 
-    MAX_SIZE_BYTES = 1 * 1024 * 1024  # 1 MB
+    MAX_SIZE_BYTES = 8 * 1024 * 1024  # 8 MB
 
     def __new__(cls, *args, **kwargs):
         with cls._lock:
@@ -23,118 +166,191 @@ class RedisLikeCache:
             return cls._instance
 
     def _init_cache(self):
-        self.cache = {}
-        self.current_size = 0
-        self.counter = 0
+        self.store = TTLLRUStore(self.MAX_SIZE_BYTES)
 
-    def _cleanup_expired(self):
-        now = time.time()
-        expired_keys = [k for k, v in self.cache.items() if v["expires"] < now]
-        for k in expired_keys:
-            self._evict_key(k)
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self.store.set(key, value, ttl_seconds)
 
-    def _evict_key(self, key):
-        entry = self.cache.pop(key, None)
-        if entry:
-            self.current_size -= entry["size"]
+    def get(self, key):
+        with self._lock:
+            return self.store.get(key)
 
-    def _evict_oldest_until_fit(self):
-        # Sorted by insertion order (ts)
-        while self.current_size > self.MAX_SIZE_BYTES and self.cache:
-            oldest_key = min(self.cache.items(), key=lambda kv: kv[1]["ts"])[0]
-            self._evict_key(oldest_key)
+    def delete(self, key):
+        with self._lock:
+            self.store.delete(key)
 
-    def set(self, key, value, ttl_seconds):
+    def update(self, key, func: Callable[[Any], tuple]):
+        """
+        Atomically read-modify-write `key`. `func` receives the current value
+        (or None) and returns (new_value, ttl_seconds, result); `result` is
+        returned to the caller. A new_value of None leaves the key untouched.
+        """
         with self._lock:
-            self._cleanup_expired()
+            new_value, ttl_seconds, result = func(self.store.get(key))
+            if new_value is not None:
+                self.store.set(key, new_value, ttl_seconds)
+            return result
 
-            expires = time.time() + ttl_seconds
-            serialized = pickle.dumps(value)
-            size = len(serialized)
-            self.counter += 1
-            
-            if key in self.cache:
-                self._evict_key(key)
-            
-            self.cache[key] = {
-                "value": serialized,
-                "expires": expires,
-                "size": size,
-                "ts": self.counter
-            }
-            self.current_size += size            
-            self._evict_oldest_until_fit()
 
-    def get(self, key):
-        with self._lock:
-            self._cleanup_expired()
+# Shared backend key present while cache entries must be computed from the
+# primary (see SizeBasedAPICache.read_pool)
+PRIMARY_READS_KEY = "db:primary_reads"
 
-            entry = self.cache.get(key)
-            if not entry:
-                return None
 
-            if entry["expires"] < time.time():
-                self._evict_key(key)
-                return None
+# Entity tags of a cache entry, or a function deriving them from the computed model
+Tags = Union[Iterable[str], Callable[[BaseModel], Iterable[str]]]
+
+
+class CachedResponse(NamedTuple):
+    """Final JSON body of a response, its gzip encoding and strong ETag."""
+
+    body: bytes
+    gzip_body: Optional[bytes]
+    etag: str
 
-            return pickle.loads(entry["value"])
+    # Smaller bodies are not worth compressing (same as GZipMiddleware)
+    GZIP_MIN_SIZE = 1000
 
+    @classmethod
+    def from_model(cls, model: BaseModel) -> "CachedResponse":
+        body = model.model_dump_json().encode()
+        gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= cls.GZIP_MIN_SIZE else None
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        return cls(body, gzip_body, etag)
 
-T = TypeVar("T", bound=BaseModel)
+    def to_bytes(self) -> bytes:
+        # b"<etag>\n<len(body)>\n<body><gzip body>"
+        return b"%s\n%d\n%s%s" % (self.etag.encode(), len(self.body), self.body, self.gzip_body or b"")
+
+    @classmethod
+    def from_bytes(cls, raw: bytes) -> "CachedResponse":
+        etag, body_size, payload = raw.split(b"\n", 2)
+        body_size = int(body_size)
+        return cls(payload[:body_size], payload[body_size:] or None, etag.decode())
+
+    def to_response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Vary": "Accept-Encoding"}
+        if self.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            # The encoded representation gets its own strong validator
+            headers["ETag"] = self.etag[:-1] + '-gzip"'
+            headers["Content-Encoding"] = "gzip"
+            return Response(self.gzip_body, media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
 
 
 @singleton
 class SizeBasedAPICache:
+
+    # Bookkeeping per entry (tuple, OrderedDict node, key object) on top of
+    # the payload bytes
+    ENTRY_OVERHEAD = 256
     
-    def __init__(self, max_memory_mb: float = 4.0, default_ttl: int = 3600):        
+    def __init__(
+        self,
+        max_memory_mb: float = Constants.API_CACHE_MAX_MEMORY_MB,
+        default_ttl: int = 3600,
+        stale_ttl: int = 600
+    ):        
         self.cache = OrderedDict() 
         self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
         self.current_memory_usage = 0
         self.default_ttl = default_ttl
+        # How long an expired entry may still be served while it is refreshed
+        self.stale_ttl = stale_ttl
         self.lock = Lock()
+        # key -> task computing it, shared by every concurrent caller
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Counters reported by info()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.prefix_bytes: Dict[str, int] = defaultdict(int)
+        self.prefix_items: Dict[str, int] = defaultdict(int)
+        # tag (e.g. "manga:39") -> keys of the entries carrying it
+        self.tag_index: Dict[str, Set[str]] = defaultdict(set)
+        # Bumped by every invalidation; computations that started before it
+        # are returned to their callers but not stored
+        self.generation = 0
 
-    def _get_deep_size(self, obj, seen=None):        
-        size = sys.getsizeof(obj)
-        if seen is None:
-            seen = set()
-        
-        obj_id = id(obj)
-        if obj_id in seen:
-            return 0
-        
-        seen.add(obj_id)
+    @staticmethod
+    def _prefix(key: str) -> str:
+        return key.split(":", 1)[0]
 
-        if isinstance(obj, dict):
-            size += sum([self._get_deep_size(v, seen) + self._get_deep_size(k, seen) for k, v in obj.items()])
-        elif hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes, bytearray)):
-            size += sum([self._get_deep_size(i, seen) for i in obj])
-            
-        return size
+    @classmethod
+    def entry_size(cls, key: str, value: CachedResponse) -> int:
+        return (
+            len(key)
+            + len(value.body)
+            + len(value.gzip_body or b"")
+            + len(value.etag)
+            + cls.ENTRY_OVERHEAD
+        )
 
-    def get(self, key: str):        
+    def _add(self, key: str, entry: tuple) -> None:
+        self.cache[key] = entry
+        self.current_memory_usage += entry[1]
+        prefix = self._prefix(key)
+        self.prefix_bytes[prefix] += entry[1]
+        self.prefix_items[prefix] += 1
+        for tag in entry[4]:
+            self.tag_index[tag].add(key)
+
+    def _discard(self, key: str) -> None:
+        _, size, _, _, tags = self.cache.pop(key)
+        self.current_memory_usage -= size
+        for tag in tags:
+            keys = self.tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tag_index[tag]
+        prefix = self._prefix(key)
+        self.prefix_bytes[prefix] -= size
+        self.prefix_items[prefix] -= 1
+        if not self.prefix_items[prefix]:
+            del self.prefix_bytes[prefix]
+            del self.prefix_items[prefix]
+
+    def get_entry(self, key: str) -> Optional[Tuple[CachedResponse, bool]]:
+        """Returns (value, is_fresh), or None if the key is missing or past its stale window."""
         with self.lock:
             if key not in self.cache:
                 return None
             
-            value, size, expiration_time = self.cache[key]
+            value, size, fresh_until, expiration_time, _ = self.cache[key]
+            now = time.time()
             
             # Check if the item has expired
-            if time.time() > expiration_time:
-                self.current_memory_usage -= size
-                del self.cache[key]
-                print(f"🕒 Item '{key}' expired and was removed.")
+            if now > expiration_time:
+                self._discard(key)
+                self.expirations += 1
                 return None
                         
             self.cache.move_to_end(key)
-            return value
+            return value, now <= fresh_until
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self.get_entry(key)
+        return entry[0] if entry else None
 
-    def set(self, key: str, value, ttl: Optional[int] = None):        
+    def set(
+        self,
+        key: str,
+        value: CachedResponse,
+        ttl: Optional[int] = None,
+        stale_ttl: Optional[int] = None,
+        tags: Iterable[str] = ()
+    ):        
         with self.lock:
             # Determine expiration timestamp
             expiration_ttl = ttl if ttl is not None else self.default_ttl
-            expiration_time = time.time() + expiration_ttl
+            fresh_until = time.time() + expiration_ttl
+            expiration_time = fresh_until + (stale_ttl if stale_ttl is not None else self.stale_ttl)
             
-            item_size = self._get_deep_size(key) + self._get_deep_size(value)
+            item_size = self.entry_size(key, value)
             
             if item_size > self.max_memory_bytes:
                 print(f"⚠️ Item too large ({item_size} bytes). Not cached.")
@@ -142,42 +358,297 @@ class SizeBasedAPICache:
             
             # If key exists, subtract its size before updating
             if key in self.cache:
-                _, old_size, _ = self.cache[key]
-                self.current_memory_usage -= old_size
-                self.cache.move_to_end(key)
+                self._discard(key)
             
-            self.cache[key] = (value, item_size, expiration_time)
-            self.current_memory_usage += item_size
+            self._add(key, (value, item_size, fresh_until, expiration_time, tuple(tags)))
             
             # Evict LRU items if memory limit is exceeded
             while self.current_memory_usage > self.max_memory_bytes:                
-                evicted_key, (_, evicted_size, _) = self.cache.popitem(last=False)
-                self.current_memory_usage -= evicted_size                
-                print(f"🧹 Evicting '{evicted_key}' to free {evicted_size} bytes.")
+                self._discard(next(iter(self.cache)))
+                self.evictions += 1
                 
+    def invalidate_local(self, tags: Iterable[str]) -> int:
+        with self.lock:
+            self.generation += 1
+            # Later misses must not join a computation started before the write
+            self._inflight.clear()
+            keys = set()
+            for tag in tags:
+                keys |= self.tag_index.get(tag, set())
+            for key in keys:
+                if key in self.cache:
+                    self._discard(key)
+            return len(keys)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """Drops every entry carrying any of `tags`, here and in the shared backend."""
+        from src.cache_backends import CacheBackendError
+        # Every catalog write ends here: keep this worker off the replica for a while
+        db.note_write()
+        removed = self.invalidate_local(tags)
+        if self.backend.shared:
+            try:
+                if db.db_read_pool is not None:
+                    # Before the entries go: the workers that recompute them
+                    # must already see the window
+                    await self.backend.set(
+                        PRIMARY_READS_KEY,
+                        b"1",
+                        Constants.DB_REPLICA_STICKY_SECONDS
+                    )
+                await self.backend.invalidate_tags(tags)
+            except CacheBackendError as e:
+                print(f"[CACHE] {e}")
+        print(f"[CACHE] [INVALIDATE] {', '.join(tags)} ({removed} local entries)")
+
+    @property
+    def backend(self):
+        # Imported lazily: src.cache_backends builds on RedisLikeCache
+        from src.cache_backends import get_cache_backend
+        return get_cache_backend()
+
+    async def read_pool(self):
+        """
+        Pool entries are computed from. A stale read would be cached for the
+        whole TTL, so the replica is used only outside the window opened by
+        a write in any worker: with a shared backend the window is the
+        PRIMARY_READS_KEY key, set by invalidate_tags.
+        """
+        from src.cache_backends import CacheBackendError
+        pool = db.get_read_pool()
+        if pool is db.get_db_pool() or not self.backend.shared:
+            return pool
+        try:
+            if await self.backend.get(PRIMARY_READS_KEY) is not None:
+                return db.get_db_pool()
+        except CacheBackendError:
+            # Can't tell whether a write just happened
+            return db.get_db_pool()
+        return pool
+
+    async def _shared_get(self, key: str) -> Optional[Tuple[CachedResponse, bool]]:
+        from src.cache_backends import CacheBackendError
+        try:
+            raw = await self.backend.get(key)
+        except CacheBackendError as e:
+            print(f"[CACHE] {e}")
+            return None
+        if raw is None:
+            return None
+        # Stored as b"<fresh until>\n<CachedResponse bytes>"
+        fresh_until, _, value = raw.partition(b"\n")
+        return CachedResponse.from_bytes(value), time.time() <= float(fresh_until)
+
+    async def _shared_set(
+        self,
+        key: str,
+        value: CachedResponse,
+        ttl: int,
+        stale_ttl: int,
+        tags: Iterable[str]
+    ) -> None:
+        from src.cache_backends import CacheBackendError
+        fresh_until = time.time() + ttl
+        try:
+            await self.backend.set(key, b"%f\n" % fresh_until + value.to_bytes(), ttl + stale_ttl, tags)
+        except CacheBackendError as e:
+            print(f"[CACHE] {e}")
+
+    async def _compute(
+        self,
+        key: str,
+        fetch_func: Callable[[Connection], Awaitable[BaseModel]],
+        ttl: int,
+        stale_ttl: int,
+        tags: Tags
+    ) -> CachedResponse:
+        generation = self.generation
+
+        # Runs detached from the request that triggered it, so it takes its
+        # own connection instead of borrowing one that may be released first.
+        # Cached routes are catalog reads: replica when configured
+        async with db.acquire(await self.read_pool()) as conn:
+            result = await fetch_func(conn)
+
+        cached = CachedResponse.from_model(result)
+        if generation != self.generation:
+            # Invalidated while computing: the result may predate the write
+            return cached
+
+        if callable(tags):
+            tags = tags(result)
+        if self.backend.shared:
+            await self._shared_set(key, cached, ttl, stale_ttl, tags)
+        else:
+            self.set(key, cached, ttl=ttl, stale_ttl=stale_ttl, tags=tags)
+        return cached
+
+    def _compute_once(
+        self,
+        key: str,
+        fetch_func: Callable[[Connection], Awaitable[BaseModel]],
+        ttl: int,
+        stale_ttl: int,
+        tags: Tags
+    ) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute(key, fetch_func, ttl, stale_ttl, tags))
+            self._inflight[key] = task
+
+            def done(t: asyncio.Task):
+                if self._inflight.get(key) is t:
+                    del self._inflight[key]
+                if not t.cancelled() and t.exception() is not None:
+                    print(f"[CACHE] [{key}] compute failed: {t.exception()}")
+
+            task.add_done_callback(done)
+        return task
+
     async def get_or_compute(
         self, 
         key: str, 
-        fetch_func: Callable[[], Any], 
-        response_model: Type[T],
-        ttl: Optional[int] = 300
-    ) -> T:                
-        cached_data = self.get(key)
-        if cached_data:
-            print(f"[CACHED] [{key}]")
-            return response_model(**cached_data)
-        
-        result = await fetch_func()
-        # Save to cache with the specified TTL
-        self.set(key, result.model_dump(mode='json'), ttl=ttl)
-        return result
+        fetch_func: Callable[[Connection], Awaitable[BaseModel]], 
+        request: Request,
+        ttl: Optional[int] = 300,
+        stale_ttl: Optional[int] = None,
+        tags: Tags = ()
+    ) -> Response:
+        """
+        Returns the cached response for `key`, computing it with
+        `fetch_func(conn)` on a miss. The body is serialized once when it is
+        computed, so hits skip Pydantic entirely. Concurrent misses share a
+        single computation, and an expired entry keeps being served for
+        `stale_ttl` seconds while one background task refreshes it.
+
+        `tags` (or a function of the computed model returning them) name the
+        entities the entry depends on, e.g. "manga:39"; see invalidate_tags.
+        """
+        ttl = ttl if ttl is not None else self.default_ttl
+        stale_ttl = stale_ttl if stale_ttl is not None else self.stale_ttl
+
+        if self.backend.shared:
+            # One copy for every worker
+            entry = await self._shared_get(key)
+        else:
+            entry = self.get_entry(key)
+
+        if entry is not None:
+            cached, fresh = entry
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._compute_once(key, fetch_func, ttl, stale_ttl, tags)
+            return cached.to_response(request)
+
+        self.misses += 1
+        # shield: a caller going away must not cancel the shared computation
+        cached = await asyncio.shield(self._compute_once(key, fetch_func, ttl, stale_ttl, tags))
+        return cached.to_response(request)
 
     def info(self):        
         with self.lock:
             mb_used = self.current_memory_usage / (1024 * 1024)
+            items = len(self.cache)
+            lookups = self.hits + self.stale_hits + self.misses
             return {
-                "items": len(self.cache),
+                "backend": type(self.backend).__name__,
+                "items": items,
                 "usage_bytes": self.current_memory_usage,
                 "usage_mb": round(mb_used, 4),
-                "max_mb": self.max_memory_bytes / (1024 * 1024)
-            }
\ No newline at end of file
+                "max_mb": self.max_memory_bytes / (1024 * 1024),
+                "avg_entry_bytes": round(self.current_memory_usage / items) if items else 0,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "inflight": len(self._inflight),
+                "prefixes": {
+                    prefix: {
+                        "items": self.prefix_items[prefix],
+                        "bytes": self.prefix_bytes[prefix]
+                    }
+                    for prefix in sorted(self.prefix_bytes)
+                }
+            }
+
+
+async def invalidate_tags(*tags: str) -> None:
+    await SizeBasedAPICache().invalidate_tags(*tags)
+
+
+def cache_key(path: str, params: Dict[str, Any]) -> str:
+    """
+    Canonical key of a cached route: its path followed by the validated query
+    params sorted by name, with None (absent) params left out. List params
+    are repeated once per value, in sorted order.
+    """
+    query = urlencode(
+        sorted(
+            (k, sorted(v, key=str) if isinstance(v, (list, tuple, set)) else v)
+            for k, v in params.items() if v is not None
+        ),
+        doseq=True
+    )
+    return f"{path}:{query}"
+
+
+def cached(
+    ttl: Optional[int] = 300,
+    tags: Tags = (),
+    stale_ttl: Optional[int] = None,
+    cache_control: Optional[str] = None
+):
+    """
+    Serves a GET route through SizeBasedAPICache.get_or_compute.
+
+    The route takes a `conn: Connection` param that FastAPI no longer sees: it
+    is only passed when the response has to be computed. The key is built by
+    cache_key from the route path and the params FastAPI validated, so
+    defaults and param order don't matter. `tags` may reference params, e.g.
+    "manga:{manga_id}" (left out when a param it references is None), or be
+    a function of the computed model.
+    `cache_control` is the Cache-Control policy sent to clients and CDNs.
+    """
+    def decorator(func: Callable[..., Awaitable[BaseModel]]):
+        signature = inspect.signature(func)
+        params = [p for name, p in signature.parameters.items() if name != "conn"]
+        takes_request = "request" in signature.parameters
+        # tag -> params it references
+        tag_params = {} if callable(tags) else {
+            tag: [field for _, field, _, _ in Formatter().parse(tag) if field]
+            for tag in tags
+        }
+        if not takes_request:
+            params.insert(0, inspect.Parameter("request", inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request))
+
+        @wraps(func)
+        async def wrapper(**kwargs) -> Response:
+            request: Request = kwargs["request"] if takes_request else kwargs.pop("request")
+            route = request.scope.get("route")
+            path = route.path if route is not None else request.url.path
+            query = {k: v for k, v in kwargs.items() if k != "request"}
+            entry_tags = tags if callable(tags) else [
+                tag.format(**kwargs)
+                for tag, fields in tag_params.items()
+                if all(kwargs[field] is not None for field in fields)
+            ]
+            response = await SizeBasedAPICache().get_or_compute(
+                key=cache_key(path, query),
+                fetch_func=lambda conn: func(**kwargs, conn=conn),
+                request=request,
+                ttl=ttl,
+                stale_ttl=stale_ttl,
+                tags=entry_tags
+            )
+            if cache_control is not None:
+                response.headers["Cache-Control"] = cache_control
+            return response
+
+        wrapper.__signature__ = signature.replace(parameters=params)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,308 @@
+from src.cache import RedisLikeCache
+from src.constants import Constants
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
+import base64
+import json
+import time
+
+
+# (allowed, remaining, reset_at)
+GCRAResult = Tuple[bool, int, float]
+
+# Largest message exchanged with the local cache server
+SOCKET_STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class CacheBackendError(Exception):
+    pass
+
+
+def gcra(tat: Optional[float], now: float, limit: int, window: float) -> Tuple[Optional[float], GCRAResult]:
+    """
+    One step of the generic cell rate algorithm (a token bucket stored as a
+    single timestamp). Returns the new theoretical arrival time to store, or
+    None when the request is rejected, and the (allowed, remaining, reset_at)
+    result.
+    """
+    interval = window / limit
+    tat = max(tat or now, now)
+    new_tat = tat + interval
+    allow_at = new_tat - window
+    if now < allow_at:
+        return None, (False, 0, allow_at)
+
+    remaining = int((window - (new_tat - now)) / interval + 1e-9)
+    return new_tat, (True, remaining, new_tat)
+
+
+class TagIndex:
+    """
+    Keys stored under each tag. Entries expire or get evicted without telling
+    the index, so a tag's set is pruned of dead keys whenever it doubles.
+    """
+
+    def __init__(self, exists: Callable[[str], bool]):
+        self.exists = exists
+        self.tags: Dict[str, Set[str]] = {}
+        self.pruned_at: Dict[str, int] = {}
+
+    def add(self, key: str, tags: Iterable[str]) -> None:
+        for tag in tags:
+            keys = self.tags.setdefault(tag, set())
+            keys.add(key)
+            if len(keys) >= 2 * self.pruned_at.get(tag, 64):
+                keys.intersection_update([k for k in keys if self.exists(k)])
+                self.pruned_at[tag] = max(len(keys), 64)
+
+    def pop(self, tags: Iterable[str]) -> Set[str]:
+        keys = set()
+        for tag in tags:
+            keys |= self.tags.pop(tag, set())
+            self.pruned_at.pop(tag, None)
+        return keys
+
+
+class CacheBackend(ABC):
+    """
+    Storage used by the rate limiter and the API cache. `shared` backends are
+    visible to every uvicorn worker; values are bytes.
+    """
+
+    shared = False
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        """Deletes every key set with any of `tags`."""
+
+    @abstractmethod
+    async def gcra(self, key: str, limit: int, window: float) -> GCRAResult:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process backend on top of RedisLikeCache."""
+
+    def __init__(self):
+        self.tag_index = TagIndex(lambda key: RedisLikeCache().get(key) is not None)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return RedisLikeCache().get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        RedisLikeCache().set(key, value, ttl)
+        self.tag_index.add(key, tags)
+
+    async def delete(self, key: str) -> None:
+        RedisLikeCache().delete(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for key in self.tag_index.pop(tags):
+            RedisLikeCache().delete(key)
+
+    async def gcra(self, key: str, limit: int, window: float) -> GCRAResult:
+        def step(tat: Optional[float]):
+            now = time.time()
+            new_tat, result = gcra(tat, now, limit, window)
+            return new_tat, (new_tat - now) if new_tat else 0, result
+
+        return RedisLikeCache().update(key, step)
+
+
+class UnixSocketBackend(CacheBackend):
+    """
+    Client for src.cache_server, a single local process that owns the data
+    for every worker on the host. Requests and responses are JSON lines, one
+    exchange at a time per connection, over a pool of up to `pool_size`
+    connections.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, pool_size: int = Constants.CACHE_SOCKET_POOL_SIZE):
+        self.path = path
+        self._idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _exchange(self, request: dict) -> bytes:
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else None
+            try:
+                if conn is None:
+                    conn = await asyncio.open_unix_connection(self.path, limit=SOCKET_STREAM_LIMIT)
+                reader, writer = conn
+                writer.write(json.dumps(request).encode() + b"\n")
+                await writer.drain()
+                line = await reader.readline()
+                if not line:
+                    raise ConnectionError("cache server closed the connection")
+            except BaseException as e:
+                # Broken, or cancelled mid-exchange (a late response would be
+                # read by the next call): the connection is not reused
+                if conn is not None:
+                    conn[1].close()
+                if isinstance(e, (OSError, ConnectionError, asyncio.LimitOverrunError, ValueError)):
+                    raise CacheBackendError(f"cache server at {self.path} unavailable: {e}") from e
+                raise
+            self._idle.append(conn)
+            return line
+
+    async def _call(self, request: dict) -> dict:
+        # Without a timeout a stalled server would hang every request of the
+        # worker, waiting for a connection of the pool included
+        try:
+            line = await asyncio.wait_for(self._exchange(request), Constants.CACHE_SOCKET_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            raise CacheBackendError(f"cache server at {self.path} timed out") from e
+
+        response = json.loads(line)
+        if "error" in response:
+            raise CacheBackendError(response["error"])
+        return response
+
+    async def get(self, key: str) -> Optional[bytes]:
+        response = await self._call({"op": "get", "key": key})
+        value = response.get("value")
+        return base64.b64decode(value) if value is not None else None
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        await self._call({
+            "op": "set",
+            "key": key,
+            "value": base64.b64encode(value).decode(),
+            "ttl": ttl,
+            "tags": list(tags)
+        })
+
+    async def delete(self, key: str) -> None:
+        await self._call({"op": "delete", "key": key})
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        await self._call({"op": "invalidate", "tags": list(tags)})
+
+    async def gcra(self, key: str, limit: int, window: float) -> GCRAResult:
+        response = await self._call({"op": "gcra", "key": key, "limit": limit, "window": window})
+        allowed, remaining, reset_at = response["result"]
+        return allowed, remaining, reset_at
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+class RedisBackend(CacheBackend):
+
+    shared = True
+
+    # Same algorithm as gcra(), run atomically inside Redis with its clock
+    GCRA_SCRIPT = """
+        local limit = tonumber(ARGV[1])
+        local window = tonumber(ARGV[2])
+        local t = redis.call('TIME')
+        local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+        local interval = window / limit
+        local tat = tonumber(redis.call('GET', KEYS[1])) or now
+        if tat < now then tat = now end
+        local new_tat = tat + interval
+        local allow_at = new_tat - window
+        if now < allow_at then
+            return {0, 0, tostring(allow_at)}
+        end
+        redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+        local remaining = math.floor((window - (new_tat - now)) / interval + 1e-9)
+        return {1, remaining, tostring(new_tat)}
+    """
+
+    # Deletes the members of every tag set, then the sets themselves
+    INVALIDATE_SCRIPT = """
+        for _, tag in ipairs(KEYS) do
+            local keys = redis.call('SMEMBERS', tag)
+            for i = 1, #keys, 1000 do
+                redis.call('DEL', unpack(keys, i, math.min(i + 999, #keys)))
+            end
+            redis.call('DEL', tag)
+        end
+        return 0
+    """
+
+    def __init__(self, url: str):
+        from redis import asyncio as aioredis
+        self.client = aioredis.from_url(url)
+        self._gcra = self.client.register_script(self.GCRA_SCRIPT)
+        self._invalidate = self.client.register_script(self.INVALIDATE_SCRIPT)
+
+    async def _run(self, coro):
+        from redis.exceptions import RedisError
+        try:
+            return await coro
+        except (RedisError, OSError) as e:
+            raise CacheBackendError(f"redis unavailable: {e}") from e
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self._run(self.client.get(key))
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        px = max(int(ttl * 1000), 1)
+        pipe = self.client.pipeline(transaction=False)
+        pipe.set(key, value, px=px)
+        for tag in tags:
+            # The tag set lives at least as long as its longest-lived key
+            pipe.sadd(f"tag:{tag}", key)
+            pipe.pexpire(f"tag:{tag}", px, gt=True)
+            pipe.pexpire(f"tag:{tag}", px, nx=True)
+        await self._run(pipe.execute())
+
+    async def delete(self, key: str) -> None:
+        await self._run(self.client.delete(key))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        await self._run(self._invalidate(keys=[f"tag:{tag}" for tag in tags]))
+
+    async def gcra(self, key: str, limit: int, window: float) -> GCRAResult:
+        allowed, remaining, reset_at = await self._run(self._gcra(keys=[key], args=[limit, window]))
+        return bool(allowed), int(remaining), float(reset_at)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_backend: Optional[CacheBackend] = None
+
+
+def get_cache_backend() -> CacheBackend:
+    """
+    Backend selected by CACHE_BACKEND: "memory" (default, per process),
+    "local" (src.cache_server over a Unix socket) or "redis" (REDIS_URL).
+    """
+    global _backend
+    if _backend is None:
+        if Constants.CACHE_BACKEND == "redis":
+            _backend = RedisBackend(Constants.REDIS_URL)
+        elif Constants.CACHE_BACKEND == "local":
+            _backend = UnixSocketBackend(Constants.CACHE_SOCKET_PATH)
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+async def close_cache_backend() -> None:
+    global _backend
+    if _backend is not None:
+        await _backend.close()
+        _backend = None
@@ -0,0 +1,93 @@
+"""
+Local cache server shared by all uvicorn workers on one host.
+
+Started automatically by `python main.py` when CACHE_BACKEND=local, or by
+hand with `python -m src.cache_server` when uvicorn is launched directly.
+"""
+from src.cache import TTLLRUStore
+from src.cache_backends import gcra, TagIndex, SOCKET_STREAM_LIMIT
+from src.constants import Constants
+import asyncio
+import base64
+import json
+import os
+import time
+
+
+class CacheServer:
+
+    def __init__(self, max_memory_bytes: int):
+        self.store = TTLLRUStore(max_memory_bytes)
+        self.tag_index = TagIndex(lambda key: self.store.ttl(key) > 0)
+
+    def dispatch(self, request: dict) -> dict:
+        # Runs to completion without awaiting, so every op is atomic
+        op = request.get("op")
+        key = request.get("key")
+
+        if op == "get":
+            value = self.store.get(key)
+            return {"value": base64.b64encode(value).decode() if value is not None else None}
+
+        if op == "set":
+            self.store.set(key, base64.b64decode(request["value"]), request["ttl"])
+            self.tag_index.add(key, request.get("tags", ()))
+            return {}
+
+        if op == "delete":
+            self.store.delete(key)
+            return {}
+
+        if op == "invalidate":
+            for key in self.tag_index.pop(request["tags"]):
+                self.store.delete(key)
+            return {}
+
+        if op == "gcra":
+            now = time.time()
+            new_tat, result = gcra(self.store.get(key), now, request["limit"], request["window"])
+            if new_tat is not None:
+                self.store.set(key, new_tat, new_tat - now)
+            return {"result": result}
+
+        return {"error": f"unknown op {op!r}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while line := await reader.readline():
+                try:
+                    response = self.dispatch(json.loads(line))
+                except (KeyError, TypeError, ValueError) as e:
+                    response = {"error": str(e)}
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(path: str, max_memory_bytes: int) -> None:
+    if os.path.exists(path):
+        os.unlink(path)
+
+    cache_server = CacheServer(max_memory_bytes)
+    server = await asyncio.start_unix_server(cache_server.handle, path=path, limit=SOCKET_STREAM_LIMIT)
+    os.chmod(path, 0o600)
+    print(f"[CACHE SERVER] listening on {path}")
+    async with server:
+        await server.serve_forever()
+
+
+def run(
+    path: str = Constants.CACHE_SOCKET_PATH,
+    max_memory_mb: float = Constants.CACHE_MAX_MEMORY_MB
+) -> None:
+    try:
+        asyncio.run(serve(path, int(max_memory_mb * 1024 * 1024)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    run()
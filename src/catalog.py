@@ -0,0 +1,245 @@
+from asyncpg import Connection
+from bisect import bisect_left, insort
+from src.schemas.manga import CatalogSuggestion
+from src.constants import Constants
+from src.monitor import get_monitor
+from src import util
+from src import db
+from typing import Dict, List, Literal, Optional, Tuple
+import asyncio
+import random
+import time
+import re
+
+
+CatalogKind = Literal['manga', 'genre', 'author']
+
+# Order in which kinds are listed when everything else ties
+KINDS: List[CatalogKind] = ['manga', 'genre', 'author']
+KIND_ORDER = {kind: i for i, kind in enumerate(KINDS)}
+
+CATALOG_QUERIES: Dict[CatalogKind, str] = {
+    # Blacklisted mangas are hidden like in the libraries and collections
+    'manga': "SELECT id, title AS name FROM mangas WHERE id NOT IN (SELECT manga_id FROM manga_blacklist)",
+    'genre': "SELECT id, genre AS name FROM genres",
+    'author': "SELECT id, name FROM authors",
+}
+
+# (folded text from a word onwards, word position, kind, id)
+Key = Tuple[str, int, int, int]
+
+
+def tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", util.fold_text(text))
+
+
+class CatalogIndex:
+    """
+    In-memory autocomplete index over manga titles, genres and author names.
+
+    Every name is accent-folded and split in words; for each of its first
+    `max_words` words the index stores the rest of the name from that word
+    on, truncated to `max_key_len` chars, in a sorted list: one list for the
+    keys that start at the first word and another for the inner words. A
+    prefix query is a bisect to the first key >= prefix followed by a scan
+    over the matching run until `limit` names are found: heads first, so
+    names starting with the query come before the ones merely containing
+    it, each group in alphabetical order. "one pi" and "piece" both find
+    "One Piece". Memory is bounded by max_words keys of at most max_key_len
+    chars per name, and a query reads at most scan_limit keys per list.
+    """
+
+    def __init__(self, max_words: int = 8, max_key_len: int = 48, scan_limit: int = 512):
+        self.max_words = max_words
+        self.max_key_len = max_key_len
+        self.scan_limit = scan_limit
+        # [keys at word 0, keys at the other words]
+        self.keys: Tuple[List[Key], List[Key]] = ([], [])
+        # (kind, id) -> display name
+        self.names: Dict[Tuple[int, int], str] = {}
+        # kind -> (sorted ids, their fingerprint), rebuilt after an id is added or removed
+        self._ids: Dict[int, Tuple[List[int], int]] = {}
+        # catalog_version of the last sync with the database
+        self.version: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _keys(self, kind: int, item_id: int, name: str) -> List[Key]:
+        words = tokenize(name)[:self.max_words]
+        return [
+            (" ".join(words[i:])[:self.max_key_len], i, kind, item_id)
+            for i in range(len(words))
+        ]
+
+    def _remove_keys(self, kind: int, item_id: int, name: str) -> None:
+        for key in self._keys(kind, item_id, name):
+            keys = self.keys[key[1] > 0]
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                del keys[i]
+
+    def upsert(self, kind: CatalogKind, item_id: int, name: str) -> None:
+        k = KIND_ORDER[kind]
+        old = self.names.get((k, item_id))
+        if old == name:
+            return
+        if old is not None:
+            self._remove_keys(k, item_id, old)
+        else:
+            self._ids.pop(k, None)
+        self.names[(k, item_id)] = name
+        for key in self._keys(k, item_id, name):
+            insort(self.keys[key[1] > 0], key)
+
+    def remove(self, kind: CatalogKind, item_id: int) -> None:
+        k = KIND_ORDER[kind]
+        old = self.names.pop((k, item_id), None)
+        if old is not None:
+            self._remove_keys(k, item_id, old)
+            self._ids.pop(k, None)
+
+    def sync(self, kind: CatalogKind, items: Dict[int, str]) -> int:
+        """
+        Makes the entries of `kind` match `items` (id -> name), touching only
+        the ones that changed. Returns how many entries were changed.
+        """
+        k = KIND_ORDER[kind]
+        current = {item_id: name for (kk, item_id), name in self.names.items() if kk == k}
+        removed = [item_id for item_id in current if item_id not in items]
+        changed = {item_id: name for item_id, name in items.items() if current.get(item_id) != name}
+
+        for item_id in removed:
+            self.remove(kind, item_id)
+
+        if len(changed) > 64:
+            # Bulk load: drop the stale keys, then sort once instead of insort per key
+            for item_id in changed:
+                self.remove(kind, item_id)
+            self._ids.pop(k, None)
+            for item_id, name in changed.items():
+                self.names[(k, item_id)] = name
+                for key in self._keys(k, item_id, name):
+                    self.keys[key[1] > 0].append(key)
+            for keys in self.keys:
+                keys.sort()
+        else:
+            for item_id, name in changed.items():
+                self.upsert(kind, item_id, name)
+
+        return len(removed) + len(changed)
+
+    def _sorted_ids(self, kind: CatalogKind) -> Tuple[List[int], int]:
+        k = KIND_ORDER[kind]
+        entry = self._ids.get(k)
+        if entry is None:
+            ids = sorted(item_id for kk, item_id in self.names if kk == k)
+            # hash() of ints and tuples is not randomized: equal in every worker
+            entry = self._ids[k] = (ids, hash(tuple(ids)) & 0xFFFFFFFF)
+        return entry
+
+    def ids(self, kind: CatalogKind) -> List[int]:
+        return self._sorted_ids(kind)[0]
+
+    def fingerprint(self, kind: CatalogKind) -> int:
+        """Identifies the id set of `kind`, and so the permutations sample() draws from it."""
+        return self._sorted_ids(kind)[1]
+
+    def sample(self, kind: CatalogKind, seed: int, offset: int, limit: int) -> List[int]:
+        """
+        Positions [offset, offset + limit) of a pseudo-random permutation of
+        the ids of `kind`, drawn from `seed`: the same seed gives the same
+        order, pages never overlap, and a page costs O(limit) whatever the
+        catalog size. The permutation is a 4-round Feistel network over the
+        smallest even power of two >= n, cycle-walking the positions >= n.
+        """
+        ids = self.ids(kind)
+        n = len(ids)
+        if offset >= n or limit <= 0:
+            return []
+        rng = random.Random(seed)
+        keys = [rng.getrandbits(32) for _ in range(4)]
+        half = max(1, ((n - 1).bit_length() + 1) // 2)
+        mask = (1 << half) - 1
+
+        def permute(i: int) -> int:
+            while True:
+                left, right = i >> half, i & mask
+                for key in keys:
+                    left, right = right, left ^ ((((right * 0x9E3779B1) ^ key) * 0x85EBCA6B >> 16) & mask)
+                i = (left << half) | right
+                if i < n:
+                    return i
+
+        return [ids[permute(i)] for i in range(offset, min(n, offset + limit))]
+
+    def search(self, q: str, limit: int = 10, kinds: Optional[List[CatalogKind]] = None) -> List[CatalogSuggestion]:
+        prefix = " ".join(tokenize(q))[:self.max_key_len]
+        if not prefix or limit <= 0:
+            return []
+
+        allowed = {KIND_ORDER[kind] for kind in kinds} if kinds else None
+
+        # dict as an ordered set: an item matched by several words counts once
+        found: Dict[Tuple[int, int], None] = {}
+        for keys in self.keys:
+            i = bisect_left(keys, (prefix,))
+            end = min(len(keys), i + self.scan_limit)
+            while i < end and len(found) < limit:
+                text, _, kind, item_id = keys[i]
+                if not text.startswith(prefix):
+                    break
+                if allowed is None or kind in allowed:
+                    found[(kind, item_id)] = None
+                i += 1
+
+        return [
+            CatalogSuggestion(kind=KINDS[kind], id=item_id, name=self.names[(kind, item_id)])
+            for kind, item_id in found
+        ]
+
+
+catalog = CatalogIndex()
+
+
+def get_catalog() -> CatalogIndex:
+    return catalog
+
+
+async def refresh_catalog(conn: Connection) -> int:
+    """
+    Syncs the index with the database, unless catalog_version (bumped by a
+    trigger when a catalog-writing transaction commits) is the one of the
+    last sync.
+    """
+    # Read first: a write made while the tables are read bumps it again
+    version = await conn.fetchval("SELECT version FROM catalog_version")
+    if version is not None and version == catalog.version:
+        return 0
+
+    start = time.perf_counter()
+    changed = 0
+    for kind, query in CATALOG_QUERIES.items():
+        rows = await conn.fetch(query)
+        changed += catalog.sync(kind, {r['id']: r['name'] for r in rows})
+    catalog.version = version
+    get_monitor().record_task("catalog_refresh", (time.perf_counter() - start) * 1000)
+    return changed
+
+
+async def periodic_catalog_refresh():
+    """
+    Writes made by this worker are applied right away by the models; this
+    catches up with the ones made by other workers and by direct SQL. Every
+    worker has its own index, so this runs in all of them, but it costs a
+    single-row read while the catalog does not change.
+    """
+    while True:
+        await asyncio.sleep(Constants.CATALOG_REFRESH_INTERVAL)
+        try:
+            async with db.acquire() as conn:
+                changed = await refresh_catalog(conn)
+            if changed:
+                print(f"[INFO] catalog index refreshed ({changed} changes)")
+        except Exception as e:
+            print(f"[ERROR] Erro ao atualizar o catalog index: {e}")
@@ -26,12 +26,87 @@ class Constants:
         "accelerometer=()"
     )
     
-    SENSITIVE_PATHS = ["/auth/", "/admin/"]
+    # Path prefixes whose responses must never be stored by any cache
+    SENSITIVE_PATHS = ["/api/v1/auth/", "/api/v1/admin/", "/api/v1/user/"]
 
     MAX_BODY_SIZE = 20 * 1024 * 1024
     MAX_REQUESTS = 300 if os.getenv("ENV", "DEV") == "PROD" else 999_999_999
     WINDOW = 60
 
+    # Per-route budgets: path prefix -> (max requests, window in seconds).
+    # The longest matching prefix wins; everything else uses MAX_REQUESTS/WINDOW.
+    RATE_LIMITS = {
+        "/api/v1/auth/login": (10, 60) if os.getenv("ENV", "DEV") == "PROD" else (999_999_999, 60),
+        "/api/v1/auth/signup": (5, 600) if os.getenv("ENV", "DEV") == "PROD" else (999_999_999, 600),
+    }
+    # Rejected requests are printed, not stored in the logs table: the first
+    # per client and limiter, then one count per client every interval
+    RATE_LIMIT_LOG_INTERVAL = int(os.getenv("RATE_LIMIT_LOG_INTERVAL", 60))
+    RATE_LIMIT_LOG_MAX_CLIENTS = 1000
+
+    # Cache / rate limit storage: "memory" (per worker), "local" (Unix socket
+    # server shared by the workers of one host) or "redis"
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+    REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    CACHE_SOCKET_PATH = os.getenv("CACHE_SOCKET_PATH", "/tmp/draynor-cache.sock")
+    CACHE_MAX_MEMORY_MB = float(os.getenv("CACHE_MAX_MEMORY_MB", 64))
+    # Seconds a call to the local cache server may take, waiting for the
+    # connection included, before the worker falls back as if it were down
+    CACHE_SOCKET_TIMEOUT = float(os.getenv("CACHE_SOCKET_TIMEOUT", 0.5))
+    # Connections each worker keeps open to the local cache server
+    CACHE_SOCKET_POOL_SIZE = int(os.getenv("CACHE_SOCKET_POOL_SIZE", 8))
+    # Per-worker response cache (SizeBasedAPICache) when CACHE_BACKEND=memory
+    API_CACHE_MAX_MEMORY_MB = float(os.getenv("API_CACHE_MAX_MEMORY_MB", 4))
+    # Freshness of tagged catalog responses. Admin writes invalidate them, but
+    # with the memory backend only in the worker that served the write
+    API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", 300 if CACHE_BACKEND == "memory" else 6 * 3600))
+    # Cache-Control of public catalog responses. Kept short because admin
+    # writes cannot invalidate browser and CDN copies
+    CATALOG_CACHE_CONTROL = os.getenv("CATALOG_CACHE_CONTROL", "public, max-age=60, stale-while-revalidate=600")
+    # Chapter image lists only change through admin writes, which invalidate
+    # them, so they stay cached for long. Clients revalidate (a 304 through
+    # the ETag) on every read so that each view reaches the view counter
+    CHAPTER_IMAGES_CACHE_TTL = int(os.getenv("CHAPTER_IMAGES_CACHE_TTL", 24 * 3600))
+    CHAPTER_IMAGES_CACHE_CONTROL = os.getenv("CHAPTER_IMAGES_CACHE_CONTROL", "public, no-cache, stale-if-error=86400")
+    # Seconds between catalog_version checks of the in-memory autocomplete
+    # index (src.catalog); it is only reloaded when the version changed
+    CATALOG_REFRESH_INTERVAL = int(os.getenv("CATALOG_REFRESH_INTERVAL", 60))
+    # Seconds between full reconciliations of manga_pages, run by one worker
+    # (src.scheduler) and only after catalog writes
+    MANGA_PAGES_RECONCILE_INTERVAL = int(os.getenv("MANGA_PAGES_RECONCILE_INTERVAL", 600))
+    # Seconds a carousel order (random sample seed) is kept when the client
+    # does not send its own seed
+    CAROUSEL_ROTATION_SECONDS = int(os.getenv("CAROUSEL_ROTATION_SECONDS", 600))
+    # Seconds between flushes of the buffered manga views (src.view_counter)
+    VIEW_COUNTER_FLUSH_INTERVAL = int(os.getenv("VIEW_COUNTER_FLUSH_INTERVAL", 10))
+    # Distinct ids (mangas and chapters, each) waiting for a flush; views of
+    # further ids are dropped while the database is unreachable
+    VIEW_COUNTER_MAX_PENDING = int(os.getenv("VIEW_COUNTER_MAX_PENDING", 50_000))
+
+    # asyncpg prepared statement cache (statements per connection). Behind
+    # PgBouncer in transaction mode set DB_PGBOUNCER=true: the cache is then
+    # disabled and only unnamed statements are used, which are safe when
+    # consecutive transactions land on different server connections.
+    # Migrations take a session advisory lock, so run them on a direct
+    # connection there (python -m src.schema_migrations)
+    DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 1024))
+    # Connections per pool, in every worker
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 5))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 20))
+    DB_POOL_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_POOL_MAX_INACTIVE_LIFETIME", 300))
+    # Optional DSN for read-only catalog queries (streaming replica; any second
+    # Postgres with the same data works, e.g. a local one in development).
+    # After a write, every worker computes cache entries from the primary
+    # (and the writer reads from it) for DB_REPLICA_STICKY_SECONDS, which must
+    # exceed the replication lag
+    DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+    DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", 5))
+    # Per-statement latency stats (src.db.QueryStats), shown in /admin/db
+    DB_QUERY_METRICS = os.getenv("DB_QUERY_METRICS", "true").lower() == "true"
+    # WebP encodings of uploaded images running at once, per worker
+    IMAGE_ENCODE_CONCURRENCY = int(os.getenv("IMAGE_ENCODE_CONCURRENCY", 2))
+
     LOGIN_MAX_FAILED_ATTEMPTS = 10
     
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
@@ -1,9 +1,15 @@
 from asyncpg import create_pool, Pool, Connection
+from asyncpg.connection import LoggedQuery
 from dotenv import load_dotenv
-from pathlib import Path
+from src.constants import Constants
 from src import migrations
-from src import util
+from src import schema_migrations
+from src.schemas.general import TotalMode
+from typing import Dict, Optional, Tuple
+from bisect import bisect_left
+import contextlib
 import psycopg
+import time
 import os
 
 
@@ -11,14 +17,130 @@ load_dotenv()
 
 
 db_pool: Pool = None
+# Pool of DATABASE_REPLICA_URL, None when reads go to the primary
+db_read_pool: Optional[Pool] = None
+# Reads are sent to the primary until this monotonic time (see note_write)
+_primary_reads_until = 0.0
+
+
+class QueryStats:
+    """
+    Latency per SQL statement, fed by the asyncpg query logger of every pool
+    connection. Statements are keyed by their whitespace-collapsed text; past
+    max_queries distinct statements the rest are counted under "other".
+    """
+
+    def __init__(self, max_queries: int = 256):
+        self.max_queries = max_queries
+        # sql -> [calls, total ms, max ms, errors]
+        self.queries: Dict[str, list] = {}
+        self.started_at = time.time()
+
+    def record(self, record: LoggedQuery) -> None:
+        sql = " ".join(record.query.split())
+        stats = self.queries.get(sql)
+        if stats is None:
+            if len(self.queries) >= self.max_queries:
+                sql = "other"
+            stats = self.queries.setdefault(sql, [0, 0.0, 0.0, 0])
+        elapsed_ms = record.elapsed * 1000
+        stats[0] += 1
+        stats[1] += elapsed_ms
+        stats[2] = max(stats[2], elapsed_ms)
+        if record.exception is not None:
+            stats[3] += 1
+
+    def reset(self) -> None:
+        self.queries.clear()
+        self.started_at = time.time()
+
+    def info(self, limit: int = 50) -> dict:
+        calls = sum(s[0] for s in self.queries.values())
+        total_ms = sum(s[1] for s in self.queries.values())
+        top = sorted(self.queries.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return {
+            "statement_cache_size": statement_cache_size(),
+            "pgbouncer": Constants.DB_PGBOUNCER,
+            "since": self.started_at,
+            "calls": calls,
+            "mean_ms": round(total_ms / calls, 3) if calls else 0,
+            "queries": [
+                {
+                    "sql": sql[:300],
+                    "calls": c,
+                    "total_ms": round(total, 3),
+                    "mean_ms": round(total / c, 3),
+                    "max_ms": round(max_ms, 3),
+                    "errors": errors
+                }
+                for sql, (c, total, max_ms, errors) in top
+            ]
+        }
+
+
+query_stats = QueryStats()
+
+
+def statement_cache_size() -> int:
+    # Named prepared statements do not survive PgBouncer transaction pooling
+    return 0 if Constants.DB_PGBOUNCER else Constants.DB_STATEMENT_CACHE_SIZE
+
+
+async def init_connection(conn: Connection) -> None:
+    if Constants.DB_QUERY_METRICS:
+        conn.add_query_logger(query_stats.record)
+
+
+class AcquireStats:
+    """Histogram of the time spent waiting for a pool connection."""
+
+    BUCKETS_MS = (0.1, 0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.acquires = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, wait_ms: float) -> None:
+        self.counts[bisect_left(self.BUCKETS_MS, wait_ms)] += 1
+        self.acquires += 1
+        self.total_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+
+    def info(self) -> dict:
+        labels = [f"<={b}ms" for b in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            "acquires": self.acquires,
+            "mean_wait_ms": round(self.total_ms / self.acquires, 3) if self.acquires else 0,
+            "max_wait_ms": round(self.max_ms, 3),
+            "histogram": dict(zip(labels, self.counts))
+        }
+
+
+# pool -> AcquireStats
+acquire_stats: Dict[str, AcquireStats] = {"primary": AcquireStats(), "replica": AcquireStats()}
+
+
+async def _create_pool(database_url: str) -> Pool:
+    return await create_pool(
+        database_url,
+        min_size=Constants.DB_POOL_MIN_SIZE,
+        max_size=Constants.DB_POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=Constants.DB_POOL_MAX_INACTIVE_LIFETIME,
+        statement_cache_size=statement_cache_size(),
+        init=init_connection
+    )
 
 
 async def db_init() -> None:
-    global db_pool
+    global db_pool, db_read_pool
     database_url = os.getenv("DATABASE_URL")
-    db_pool = await create_pool(database_url, min_size=5, max_size=20, statement_cache_size=0)
+    db_pool = await _create_pool(database_url)
     async with db_pool.acquire() as conn:
-        await util.execute_sql_file(Path("db/schema.sql"), conn)
+        await schema_migrations.migrate(conn)
+    if Constants.DATABASE_REPLICA_URL:
+        db_read_pool = await _create_pool(Constants.DATABASE_REPLICA_URL)
 
 
 def db_instance() -> psycopg.Connection:
@@ -32,17 +154,167 @@ def get_db_pool() -> Pool:
     return db_pool
 
 
+def get_read_pool() -> Pool:
+    """
+    Pool for read-only catalog queries: the replica, if configured, except
+    for DB_REPLICA_STICKY_SECONDS after a write made by this worker. The
+    response cache extends this window to every worker, see
+    SizeBasedAPICache.read_pool.
+    """
+    if db_read_pool is None or time.monotonic() < _primary_reads_until:
+        return db_pool
+    return db_read_pool
+
+
+def note_write() -> None:
+    global _primary_reads_until
+    _primary_reads_until = time.monotonic() + Constants.DB_REPLICA_STICKY_SECONDS
+
+
 async def db_close() -> None:
     await db_pool.close()
+    if db_read_pool is not None:
+        await db_read_pool.close()
+
+
+async def _checkout(pool: Pool) -> Connection:
+    """pool.acquire() that records the wait in acquire_stats."""
+    start = time.perf_counter()
+    conn = await pool.acquire()
+    name = "replica" if pool is db_read_pool else "primary"
+    acquire_stats[name].record((time.perf_counter() - start) * 1000)
+    return conn
+
+
+@contextlib.asynccontextmanager
+async def acquire(pool: Optional[Pool] = None):
+    pool = pool or db_pool
+    conn = await _checkout(pool)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+class LazyTransaction:
+
+    def __init__(self, lazy: "LazyConnection", kwargs: dict):
+        self.lazy = lazy
+        self.kwargs = kwargs
+        self.transaction = None
+
+    async def __aenter__(self):
+        conn = await self.lazy._connection()
+        self.transaction = conn.transaction(**self.kwargs)
+        await self.transaction.__aenter__()
+        self.lazy._transactions += 1
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.lazy._transactions -= 1
+        return await self.transaction.__aexit__(*exc_info)
+
+
+class LazyConnection:
+    """
+    Connection given to routes by get_db. A pool connection is checked out at
+    the first query, not when the request starts, and kept for the following
+    ones until the request ends. Routes call release() before slow non-DB
+    work (password hashing, image encoding, R2 uploads) so the connection
+    goes back to the pool meanwhile; the next query checks out another one.
+    """
+
+    def __init__(self, pool: Pool):
+        self.pool = pool
+        self.conn: Optional[Connection] = None
+        # Open transactions on self.conn: it can't be released until they end
+        self._transactions = 0
+
+    async def _connection(self) -> Connection:
+        if self.conn is None:
+            self.conn = await _checkout(self.pool)
+        return self.conn
+
+    async def release(self) -> None:
+        if self.conn is None or self._transactions:
+            return
+        conn, self.conn = self.conn, None
+        await self.pool.release(conn)
+
+    async def execute(self, *args, **kwargs):
+        return await (await self._connection()).execute(*args, **kwargs)
+
+    async def executemany(self, *args, **kwargs):
+        return await (await self._connection()).executemany(*args, **kwargs)
+
+    async def fetch(self, *args, **kwargs):
+        return await (await self._connection()).fetch(*args, **kwargs)
+
+    async def fetchrow(self, *args, **kwargs):
+        return await (await self._connection()).fetchrow(*args, **kwargs)
+
+    async def fetchval(self, *args, **kwargs):
+        return await (await self._connection()).fetchval(*args, **kwargs)
+
+    def transaction(self, **kwargs) -> LazyTransaction:
+        return LazyTransaction(self, kwargs)
 
 
 async def get_db():
-    async with db_pool.acquire() as conn:
+    conn = LazyConnection(db_pool)
+    try:
         yield conn
+    finally:
+        await conn.release()
+
+
+async def get_read_db():
+    """get_db for read-only catalog routes, served by the replica when there is one."""
+    conn = LazyConnection(get_read_pool())
+    try:
+        yield conn
+    finally:
+        await conn.release()
+
+
+# table -> (reltuples estimate, monotonic expiry)
+_estimates: Dict[str, Tuple[int, float]] = {}
+ESTIMATE_TTL = 60
+
+
+async def db_count(table: str, conn: Connection, mode: TotalMode = "exact") -> Optional[int]:
+    """
+    Row count of `table`. "exact" reads table_row_counts, kept up to date by
+    triggers, and only falls back to COUNT(*) for tables it does not track.
+    "estimate" uses the planner statistics (pg_class.reltuples, summed over
+    partitions), cached for ESTIMATE_TTL seconds. "none" returns None.
+    """
+    if mode == "none":
+        return None
 
+    if mode == "estimate":
+        cached = _estimates.get(table)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        estimate = await conn.fetchval(
+            """
+                SELECT
+                    COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::BIGINT
+                FROM
+                    pg_class c
+                WHERE
+                    c.oid = $1::regclass
+                    OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = $1::regclass)
+            """,
+            table
+        )
+        _estimates[table] = (estimate, time.monotonic() + ESTIMATE_TTL)
+        return estimate
 
-async def db_count(table: str, conn: Connection) -> int:
-    return await conn.fetchval(f"SELECT COUNT(*) AS total FROM {table};")
+    total = await conn.fetchval("SELECT row_count FROM table_row_counts WHERE table_name = $1", table)
+    if total is None:
+        total = await conn.fetchval(f"SELECT COUNT(*) AS total FROM {table};")
+    return total
 
 
 async def db_version(conn: Connection) -> str:
@@ -11,3 +11,9 @@ class DatabaseError(Exception):
         base = f"[DatabaseError] {self.detail}"
         if self.code: base += f" (code: {self.code})"
         return base
+
+
+class MigrationError(Exception):
+
+    def __str__(self):
+        return f"[MigrationError] {super().__str__()}"
@@ -1,30 +1,396 @@
-from fastapi import Request
+from fastapi import Request, status
+from fastapi.exceptions import HTTPException
 from fastapi.responses import Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from fastapi.responses import JSONResponse
 from src.constants import Constants
+from src.monitor import get_monitor
+from src import ratelimit
+from src import util
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import time
 
 
-def add_security_headers(request: Request, response: Response) -> None:    
-    response.headers["X-Content-Type-Options"] = "nosniff"    
-    response.headers["X-Frame-Options"] = "DENY"
-    response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"    
-    response.headers["Permissions-Policy"] = Constants.PERMISSIONS_POLICY_HEADER
-    
-    if Constants.IS_PRODUCTION:
-        response.headers["Strict-Transport-Security"] = ("max-age=31536000; includeSubDomains; preload")
-        
-    response.headers["Content-Security-Policy"] = (
-        "default-src 'none'; "
-        "frame-ancestors 'none';"
-    )    
-    
-    is_sensitive = any(request.url.path.startswith(path) for path in Constants.SENSITIVE_PATHS)
-    
-    if is_sensitive:
-        response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, private"
-        response.headers["Pragma"] = "no-cache"
-        response.headers["Expires"] = "0"
-    else:
-        if request.url.path.startswith("/static/"):
-            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+# Served without rate limiting, security headers or monitoring: the
+# Content-Security-Policy would break the Swagger UI
+DOCS_PATHS = frozenset(["/docs", "/redoc", "/openapi.json"])
+
+# Left uncompressed by GZipMiddleware (starlette DEFAULT_EXCLUDED_CONTENT_TYPES)
+GZIP_EXCLUDED_CONTENT_TYPES = ("text/event-stream",)
+
+
+class PrefixTrie:
+    """Maps path prefixes to values; lookup returns the longest match."""
+
+    def __init__(self, default=None):
+        self.root: dict = {}
+        self.default = default
+
+    def insert(self, prefix: str, value) -> None:
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node[None] = value
+
+    def lookup(self, path: str):
+        node = self.root
+        value = self.default
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            value = node.get(None, value)
+        return value
+
+
+# Response headers per path class, encoded once per process
+_BASE_HEADERS = [
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    (b"permissions-policy", Constants.PERMISSIONS_POLICY_HEADER.encode("latin-1")),
+    (b"content-security-policy", b"default-src 'none'; frame-ancestors 'none';"),
+]
+if Constants.IS_PRODUCTION:
+    _BASE_HEADERS.append((b"strict-transport-security", b"max-age=31536000; includeSubDomains; preload"))
+
+SENSITIVE_HEADERS = _BASE_HEADERS + [
+    (b"cache-control", b"no-store, no-cache, must-revalidate, private"),
+    (b"pragma", b"no-cache"),
+    (b"expires", b"0"),
+]
+STATIC_HEADERS = _BASE_HEADERS + [(b"cache-control", b"public, max-age=31536000, immutable")]
+PUBLIC_HEADERS = _BASE_HEADERS
+# Routes may declare their own policy (see cache_control()); this is the default
+PUBLIC_DEFAULT_CACHE_CONTROL = (b"cache-control", b"no-cache")
+
+
+def _path_class(headers: list) -> tuple:
+    return headers, frozenset(name for name, _ in headers)
+
+
+_path_headers = PrefixTrie(default=_path_class(PUBLIC_HEADERS))
+_path_headers.insert("/static/", _path_class(STATIC_HEADERS))
+for _path in Constants.SENSITIVE_PATHS:
+    _path_headers.insert(_path, _path_class(SENSITIVE_HEADERS))
+
+# Per-client headers: a shared cache would replay them to every other client
+CLIENT_HEADERS = frozenset([b"x-ratelimit-limit", b"x-ratelimit-remaining", b"x-ratelimit-reset"])
+
+
+def shared_cacheable(cache_control: bytes) -> bool:
+    """Whether a response with this Cache-Control may be stored by a shared cache."""
+    directives = {d.split(b"=", 1)[0].strip().lower() for d in cache_control.split(b",")}
+    return not directives & {b"private", b"no-store"}
+
+
+def add_security_headers(path: str, raw_headers: list) -> list:
+    """
+    Returns `raw_headers` (as sent in http.response.start) with the security
+    and Cache-Control headers of the path class. Values already set by the
+    route are replaced, except Cache-Control on public paths. The per-client
+    CLIENT_HEADERS are dropped when the response may be stored by a shared cache.
+    """
+    headers, names = _path_headers.lookup(path)
+    result = [h for h in raw_headers if h[0].lower() not in names] + headers
+    if headers is PUBLIC_HEADERS and not any(name.lower() == b"cache-control" for name, _ in raw_headers):
+        result.append(PUBLIC_DEFAULT_CACHE_CONTROL)
+    cache_control = b",".join(value for name, value in result if name.lower() == b"cache-control")
+    if shared_cacheable(cache_control):
+        return [h for h in result if h[0].lower() not in CLIENT_HEADERS]
+    return result
+
+
+def cache_control(policy: str):
+    """
+    Dependency setting the Cache-Control policy of a route, e.g.
+    `dependencies=[Depends(cache_control("private, no-cache"))]`. Routes served
+    through src.cache.cached take `cache_control=` instead.
+    """
+    def set_cache_control(response: Response) -> None:
+        response.headers["Cache-Control"] = policy
+    return set_cache_control
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class ConditionalRequestMiddleware:
+    """
+    Answers GET/HEAD requests whose If-None-Match matches the response ETag
+    with 304 Not Modified. Responses without an ETag get one from a hash of
+    their body when it is small enough to buffer.
+
+    Runs inside GZipMiddleware, whose output embeds the current time: ETags
+    are computed from the identity body, and the responses GZipMiddleware
+    will compress get a "-gzip" variant, as CachedResponse does.
+    """
+
+    # Headers kept on a 304, as required by RFC 9110
+    NOT_MODIFIED_HEADERS = {b"cache-control", b"content-location", b"date", b"etag", b"expires", b"vary"}
+
+    def __init__(self, app: ASGIApp, max_body_size: int = 1024 * 1024, gzip_minimum_size: Optional[int] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        # minimum_size of the GZipMiddleware around this one, None without it
+        self.gzip_minimum_size = gzip_minimum_size
+
+    def gzipped(self, scope: Scope, headers: MutableHeaders, body: bytes) -> bool:
+        """Whether GZipMiddleware will compress this response (same checks)."""
+        return (
+            self.gzip_minimum_size is not None
+            and len(body) >= self.gzip_minimum_size
+            and "gzip" in Headers(scope=scope).get("accept-encoding", "")
+            and "content-encoding" not in headers
+            and not headers.get("content-type", "").startswith(GZIP_EXCLUDED_CONTENT_TYPES)
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        start: Message = {}
+        chunks: List[bytes] = []
+        size = 0
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, size, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                start = message
+                if message["status"] != 200:
+                    passthrough = True
+                    await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            size += len(chunks[-1])
+            more_body = message.get("more_body", False)
+            if more_body and size <= self.max_body_size:
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            if more_body:
+                # Streaming or too large: sent as is, without a validator
+                passthrough = True
+                await send(start)
+                await send({"type": "http.response.body", "body": b"".join(chunks), "more_body": True})
+                return
+
+            body = b"".join(chunks)
+            etag = headers.get("etag")
+            if etag is None and scope["method"] == "GET":
+                etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+                headers["ETag"] = etag
+            if etag is not None and self.gzipped(scope, headers, body):
+                etag = etag[:-1] + '-gzip"'
+                headers["ETag"] = etag
+
+            if if_none_match is not None and etag is not None and etag_matches(if_none_match, etag):
+                start["status"] = 304
+                start["headers"] = [
+                    (name, value) for name, value in start["headers"]
+                    if name in self.NOT_MODIFIED_HEADERS
+                ]
+                body = b""
+
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+
+class BodyLimitMiddleware:
+    """
+    Rejects request bodies larger than `max_body_size` with 413. Chunks are
+    counted as the app reads them and passed through untouched, so nothing is
+    buffered here. The error is raised from `receive`, inside the route, so
+    the registered exception handlers build and log the response.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int = Constants.MAX_BODY_SIZE):
+        self.app = app
+        self.max_body_size = max_body_size
+
+    def too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Request entity too large. Max allowed: {self.max_body_size} bytes"
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        declared_too_large = content_length is not None and (
+            not content_length.isdigit() or int(content_length) > self.max_body_size
+        )
+        received = 0
+
+        async def receive_wrapper() -> Message:
+            nonlocal received
+            if declared_too_large:
+                raise self.too_large()
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    raise self.too_large()
+            return message
+
+        await self.app(scope, receive_wrapper, send)
+
+
+class SecurityHeadersMiddleware:
+    """Adds the security and Cache-Control headers of add_security_headers."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in DOCS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = add_security_headers(scope["path"], message.get("headers", []))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class RateLimitMiddleware:
+    """
+    Applies the rate limiter of the route (src.ratelimit) per client. Allowed
+    requests get the X-RateLimit-* headers, which SecurityHeadersMiddleware
+    drops again from responses a shared cache may store; the others a 429
+    without reaching the app.
+
+    Rejections are aggregated and printed (see log_rejected) rather than
+    written to the logs table: a flood would otherwise turn into DB writes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.rejected: Dict[Tuple[str, str], int] = {}
+        self.rejected_since = time.monotonic()
+
+    def log_rejected(self, identifier: str, limiter: ratelimit.RateLimiter, path: str) -> None:
+        """
+        Prints the first rejection of each client and limiter, then a count
+        per client every RATE_LIMIT_LOG_INTERVAL seconds. Clients beyond
+        RATE_LIMIT_LOG_MAX_CLIENTS are only counted in the total.
+        """
+        get_monitor().increment_error()
+        now = time.monotonic()
+        if now - self.rejected_since >= Constants.RATE_LIMIT_LOG_INTERVAL:
+            elapsed = int(now - self.rejected_since)
+            for (client, name), count in self.rejected.items():
+                if count > 1 or name == "*":
+                    print(f"[RATE LIMIT] {client} ({name}): {count} requests rejected in {elapsed}s")
+            self.rejected.clear()
+            self.rejected_since = now
+
+        key = (identifier, limiter.name)
+        if key in self.rejected:
+            self.rejected[key] += 1
+        elif len(self.rejected) < Constants.RATE_LIMIT_LOG_MAX_CLIENTS:
+            self.rejected[key] = 1
+            print(f"[RATE LIMIT] {identifier} ({limiter.name}) exceeded {limiter.limit}/{limiter.window}s at {path}")
         else:
-            response.headers["Cache-Control"] = "no-cache"
+            overflow = ("<other clients>", "*")
+            self.rejected[overflow] = self.rejected.get(overflow, 0) + 1
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in DOCS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        identifier = util.get_client_identifier(Request(scope))
+        limiter = ratelimit.get_rate_limiter(path)
+        allowed, remaining, reset_at = await limiter.hit(identifier)
+        reset_after = str(ratelimit.seconds_until_reset(reset_at))
+
+        if not allowed:
+            detail = {
+                "error": "Too many requests",
+                "message": f"Rate limit exceeded. Try again in {reset_after} seconds.",
+                "retry_after": reset_after,
+                "limit": limiter.limit,
+                "window": limiter.window
+            }
+            headers = {
+                "Cache-Control": "no-store",
+                "Retry-After": reset_after,
+                "X-RateLimit-Limit": str(limiter.limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": reset_after
+            }
+            self.log_rejected(identifier, limiter, path)
+            response = JSONResponse(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                content={
+                    "detail": detail,
+                    "path": path,
+                    "status_code": status.HTTP_429_TOO_MANY_REQUESTS,
+                    "timestamp": str(datetime.now())
+                },
+                headers=headers
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(limiter.limit)
+                headers["X-RateLimit-Remaining"] = str(remaining)
+                headers["X-RateLimit-Reset"] = reset_after
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class TimingMiddleware:
+    """
+    Sets X-Response-Time (time until the response headers are sent) and
+    feeds it to the system monitor.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in DOCS_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_time_ms = (time.perf_counter() - start_time) * 1000
+                MutableHeaders(scope=message)["X-Response-Time"] = f"{response_time_ms:.2f}ms"
+                get_monitor().increment_request(response_time_ms)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
\ No newline at end of file
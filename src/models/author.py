@@ -11,6 +11,8 @@ from asyncpg import Connection
 from src.schemas.general import Pagination, IntId
 from src.exceptions import DatabaseError
 from src.db import db_count
+from src.cache import invalidate_tags
+from src.catalog import get_catalog
 from typing import Optional
 
 
@@ -164,6 +166,8 @@ async def create_author(author: AuthorCreate, conn: Connection) -> Author:
             """,
             author.name
         )
+    else:
+        get_catalog().upsert('author', r['id'], r['name'])
 
     return Author(**dict(r))
 
@@ -192,6 +196,8 @@ async def update_author(author: AuthorUpdate, conn: Connection) -> Author:
             code="404"
         )
 
+    await invalidate_tags("authors")
+    get_catalog().upsert('author', r['id'], r['name'])
     return Author(**dict(r))
     
 
@@ -206,6 +212,8 @@ async def delete_author(author: IntId, conn: Connection) -> None:
         """,
         author.id
     )
+    await invalidate_tags("authors")
+    get_catalog().remove('author', author.id)
 
 
 async def create_manga_author(author: MangaAuthorCreate, conn: Connection) -> None:
@@ -226,6 +234,7 @@ async def create_manga_author(author: MangaAuthorCreate, conn: Connection) -> No
         author.manga_id,
         author.role
     )
+    await invalidate_tags("authors")
 
 
 async def delete_manga_author(author: MangaAuthorDelete, conn: Connection) -> None:
@@ -241,4 +250,5 @@ async def delete_manga_author(author: MangaAuthorDelete, conn: Connection) -> No
         author.author_id,
         author.manga_id,
         author.role
-    )
\ No newline at end of file
+    )
+    await invalidate_tags("authors")
@@ -1,22 +1,35 @@
 from asyncpg import Connection
 from typing import Optional, Literal
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from src.schemas.chapter import Chapter, ChapterCreate, ChapterUpdate, MangaChapters
 from src.schemas.manga import Manga
 from src.db import db_count
 from src.exceptions import DatabaseError
+from src.cache import invalidate_tags
+from src import util
+from datetime import datetime
 
 
 async def get_chapters(
     limit: int,
     offset: int, 
     conn: Connection,
-    manga_id: Optional[int] = None
+    manga_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
 ) -> Pagination[Chapter]:
     if manga_id:
-        total: int = await conn.fetchval("SELECT COUNT(*) FROM chapters WHERE manga_id = $1", manga_id)
+        total: Optional[int] = None
+        if total_mode != 'none':
+            total = await conn.fetchval("SELECT COUNT(*) FROM chapters WHERE manga_id = $1", manga_id)
+        params = [manga_id, limit, offset]
+        keyset = ""
+        if cursor:
+            params.extend(util.decode_cursor(cursor, (int,)))
+            params[2] = 0
+            keyset = "AND chapter_index > $4"
         rows = await conn.fetch(
-            """
+            f"""
                 SELECT
                     id,
                     manga_id,
@@ -27,6 +40,7 @@ async def get_chapters(
                     chapters
                 WHERE
                     manga_id = $1
+                    {keyset}
                 ORDER BY
                     chapter_index ASC
                 LIMIT
@@ -34,14 +48,20 @@ async def get_chapters(
                 OFFSET
                     $3           
             """,
-            manga_id,
-            limit,
-            offset
+            *params
         )
+        offset = params[2]
+        next_cursor = util.encode_cursor(rows[-1]['chapter_index']) if rows and len(rows) == limit else None
     else:
-        total: int = await db_count("chapters", conn)
+        total: Optional[int] = await db_count("chapters", conn, total_mode)
+        params = [limit, offset]
+        keyset = ""
+        if cursor:
+            params.extend(util.decode_cursor(cursor, (datetime, int)))
+            params[1] = 0
+            keyset = "WHERE (created_at, id) < ($3, $4)"
         rows = await conn.fetch(
-            """
+            f"""
                 SELECT
                     id,
                     manga_id,
@@ -50,25 +70,27 @@ async def get_chapters(
                     created_at
                 FROM
                     chapters
+                {keyset}
                 ORDER BY
-                    created_at DESC
+                    created_at DESC, id DESC
                 LIMIT
                     $1
                 OFFSET
                     $2           
             """,
-            limit,
-            offset
+            *params
         )
+        offset = params[1]
+        next_cursor = util.encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if rows and len(rows) == limit else None
 
     return Pagination(
         total=total,
         limit=limit,
         offset=offset,
-        results=[Chapter(**dict(row)) for row in rows]
+        results=[Chapter(**dict(row)) for row in rows],
+        next_cursor=next_cursor
     )
 
-
 async def get_manga_chapters(
     manga_id: int,
     limit: Optional[int],
@@ -153,6 +175,7 @@ async def create_chapter(chapter: ChapterCreate, conn: Connection) -> Chapter:
         chapter.chapter_index,
         chapter.chapter_name
     )
+    await invalidate_tags(f"manga:{chapter.manga_id}")
 
     r = await conn.fetchrow(
         """
@@ -223,16 +246,20 @@ async def update_chapter(chapter: ChapterUpdate, conn: Connection) -> Chapter:
         chapter.chapter_name,
         chapter.id
     )
+    await invalidate_tags(f"manga:{new_chapter['manga_id']}", f"chapter:{chapter.id}")
     
     return Chapter(**new_chapter)
 
 
 async def delete_chapter(chapter: IntId, conn: Connection) -> None:
-    await conn.execute(
-        "DELETE FROM chapters WHERE id = $1",
+    manga_id = await conn.fetchval(
+        "DELETE FROM chapters WHERE id = $1 RETURNING manga_id",
         chapter.id
     )
+    if manga_id is not None:
+        await invalidate_tags(f"manga:{manga_id}", f"chapter:{chapter.id}")
 
 
 async def delete_all_chapters(conn: Connection) -> None:
-    await conn.execute("DELETE FROM chapters;")
\ No newline at end of file
+    await conn.execute("DELETE FROM chapters;")
+    await invalidate_tags("chapters")
\ No newline at end of file
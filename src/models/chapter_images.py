@@ -1,16 +1,32 @@
 from asyncpg import Connection
 from src.schemas.chapter import ChapterImage, ChapterImageList, Chapter, ChapterImageListCreate, ChapterImageCreate, ChapterImageDelete
-from src.schemas.general import IntId, Pagination
+from src.schemas.general import IntId, Pagination, TotalMode
 from src.schemas.manga import Manga
 from src.exceptions import DatabaseError
+from src.cache import invalidate_tags
+from src import util
+from datetime import datetime
+from typing import Optional
 from src.db import db_count
 import asyncio
 
 
-async def get_all_chapter_images(limit: int, offset: int, conn: Connection) -> Pagination[ChapterImage]:
-    total: int = await db_count("chapter_images", conn)
+async def get_all_chapter_images(
+    limit: int,
+    offset: int,
+    conn: Connection,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
+) -> Pagination[ChapterImage]:
+    total: Optional[int] = await db_count("chapter_images", conn, total_mode)
+    params = [limit, offset]
+    keyset = ""
+    if cursor:
+        params.extend(util.decode_cursor(cursor, (datetime, int, int)))
+        params[1] = 0
+        keyset = "WHERE (created_at, chapter_id, image_index) < ($3, $4, $5)"
     rows = await conn.fetch(
-        """
+        f"""
             SELECT
                 chapter_id,
                 image_index,
@@ -20,22 +36,28 @@ async def get_all_chapter_images(limit: int, offset: int, conn: Connection) -> P
                 created_at
             FROM
                 chapter_images
+            {keyset}
             ORDER BY
-                created_at DESC
+                created_at DESC, chapter_id DESC, image_index DESC
             LIMIT
                 $1
             OFFSET
                 $2
         """,
-        limit,
-        offset
+        *params
     )
 
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        next_cursor = util.encode_cursor(last['created_at'], last['chapter_id'], last['image_index'])
+
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[ChapterImage(**dict(row)) for row in rows]
+        offset=params[1],
+        results=[ChapterImage(**dict(row)) for row in rows],
+        next_cursor=next_cursor
     )
 
 
@@ -106,15 +128,6 @@ async def get_chapter_images(chapter_id: int, conn: Connection) -> ChapterImageL
     )
 
     images = [ChapterImage(**dict(r)) for r in rows]
-    
-    await conn.execute(
-        """
-        UPDATE manga_metrics
-        SET total_reads = total_reads + 1
-        WHERE manga_id = $1
-        """,
-        manga_model.id
-    )    
 
     return ChapterImageList(
         manga=manga_model,
@@ -149,6 +162,7 @@ async def create_chapter_image(chapter_image: ChapterImageCreate, conn: Connecti
         chapter_image.width,
         chapter_image.height
     )
+    await invalidate_tags(f"chapter:{chapter_image.chapter_id}")
 
 
 async def create_chapter_images(chapter_images: ChapterImageListCreate, conn: Connection) -> None:
@@ -176,10 +190,12 @@ async def create_chapter_images(chapter_images: ChapterImageListCreate, conn: Co
         """,
         args
     )
+    await invalidate_tags(f"chapter:{chapter_images.chapter_id}")
 
 
 async def delete_chapter_images(chapter: IntId, conn: Connection):
     await conn.execute("DELETE FROM chapter_images WHERE chapter_id = $1", chapter.id)
+    await invalidate_tags(f"chapter:{chapter.id}")
 
 
 async def delete_chapter_image(chapter_image: ChapterImageDelete, conn: Connection):
@@ -187,4 +203,5 @@ async def delete_chapter_image(chapter_image: ChapterImageDelete, conn: Connecti
         "DELETE FROM chapter_images WHERE chapter_id = $1 AND image_index = $2", 
         chapter_image.chapter_id, 
         chapter_image.image_index
-    )
\ No newline at end of file
+    )
+    await invalidate_tags(f"chapter:{chapter_image.chapter_id}")
\ No newline at end of file
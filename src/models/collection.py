@@ -6,21 +6,31 @@ from src.schemas.collection import (
     CollectionUpdate
 )
 from asyncpg import Connection
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from src.schemas.manga import Manga
 from src.exceptions import DatabaseError
 from src.util import coalesce
 from src.db import db_count
+from src import util
+from typing import Optional
 
 
 async def get_collections(
     limit: int,
     offset: int,
-    conn: Connection
+    conn: Connection,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
 ) -> Pagination[Collection]:
-    total: int = await db_count("collections", conn)    
+    total: Optional[int] = await db_count("collections", conn, total_mode)    
+    params = [limit, offset]
+    keyset = ""
+    if cursor:
+        params.extend(util.decode_cursor(cursor, (str, int)))
+        params[1] = 0
+        keyset = "WHERE (title, id) > ($3, $4)"
     rows = await conn.fetch(
-        """
+        f"""
             SELECT
                 id,
                 title,
@@ -28,22 +38,23 @@ async def get_collections(
                 created_at
             FROM
                 collections
+            {keyset}
             ORDER BY
-                title ASC
+                title ASC, id ASC
             LIMIT
                 $1
             OFFSET
                 $2
         """,
-        limit,
-        offset
+        *params
     )
 
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[Collection(**dict(row)) for row in rows]
+        offset=params[1],
+        results=[Collection(**dict(row)) for row in rows],
+        next_cursor=util.encode_cursor(rows[-1]['title'], rows[-1]['id']) if rows and len(rows) == limit else None
     )
 
 
@@ -131,7 +142,8 @@ async def get_mangas_from_collection(
     collection: IntId, 
     limit: int, 
     offset: int, 
-    conn: Connection
+    conn: Connection,
+    cursor: Optional[str] = None
 ) -> Pagination[Manga]:
     total: int = await conn.fetchval(
         """
@@ -148,8 +160,15 @@ async def get_mangas_from_collection(
         collection.id
     )
 
+    params = [collection.id, limit, offset]
+    keyset = ""
+    if cursor:
+        params.extend(util.decode_cursor(cursor, (str, int)))
+        params[2] = 0
+        keyset = "AND (m.title, m.id) > ($4, $5)"
+
     rows = await conn.fetch(
-        """
+        f"""
             SELECT
                 m.id,
                 m.title,
@@ -169,23 +188,23 @@ async def get_mangas_from_collection(
                 AND m.id NOT IN (
                     SELECT manga_id FROM manga_blacklist
                 )
+                {keyset}
             ORDER BY
-                m.title ASC
+                m.title ASC, m.id ASC
             LIMIT
                 $2
             OFFSET
                 $3
         """,
-        collection.id,
-        limit,
-        offset
+        *params
     )
 
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[Manga(**dict(row)) for row in rows]
+        offset=params[2],
+        results=[Manga(**dict(row)) for row in rows],
+        next_cursor=util.encode_cursor(rows[-1]['title'], rows[-1]['id']) if rows and len(rows) == limit else None
     )
 
 
@@ -3,6 +3,8 @@ from src.schemas.general import Pagination, IntId
 from asyncpg import Connection
 from src.db import db_count
 from src.exceptions import DatabaseError
+from src.cache import invalidate_tags
+from src.catalog import get_catalog
 from typing import Optional
 
 
@@ -94,6 +96,9 @@ async def create_genre(genre: GenreCreate, conn: Connection) -> Genre:
             """,
             genre.genre,
         )
+    else:
+        await invalidate_tags("genres")
+        get_catalog().upsert('genre', row['id'], row['genre'])
 
     return Genre(**dict(row))
 
@@ -108,6 +113,8 @@ async def delete_genre(genre: IntId, conn: Connection) -> None:
         """,
         genre.id
     )
+    await invalidate_tags("genres", f"genre:{genre.id}")
+    get_catalog().remove('genre', genre.id)
 
 
 async def create_manga_genre(manga_genre: MangaGenreCreate, conn: Connection) -> None:
@@ -133,6 +140,8 @@ async def create_manga_genre(manga_genre: MangaGenreCreate, conn: Connection) ->
         manga_genre.genre_id,
         manga_genre.manga_id
     )
+    # "genres": genre filters and genre lists of the ranked search and carousel
+    await invalidate_tags("genres", f"genre:{manga_genre.genre_id}")
 
 
 async def get_manga_genres(manga: IntId, conn: Connection) -> MangaGenreList:
@@ -199,4 +208,6 @@ async def delete_manga_genre(manga_genre: MangaGenre, conn: Connection) -> None:
         """,
         manga_genre.genre_id,
         manga_genre.manga_id
-    )
\ No newline at end of file
+    )
+    # "genres": genre filters and genre lists of the ranked search and carousel
+    await invalidate_tags("genres", f"genre:{manga_genre.genre_id}")
\ No newline at end of file
@@ -8,6 +8,9 @@ from src.schemas.general import Pagination, IntId
 from src.schemas.manga import Manga
 from src.schemas.user import User
 from asyncpg import Connection
+from typing import Optional
+from src import util
+from datetime import datetime
 
 
 async def upsert_reading_status(reading_status: ReadingStatusCreate, user: User, conn: Connection) -> None:
@@ -60,7 +63,8 @@ async def get_mangas_by_reading_status(
     user: User,
     limit: int,
     offset: int,
-    conn: Connection
+    conn: Connection,
+    cursor: Optional[str] = None
 ) -> Pagination[Manga]:
     total = await conn.fetchval(
         """
@@ -80,8 +84,14 @@ async def get_mangas_by_reading_status(
         reading_status,
         user.id
     )
+    params = [reading_status, user.id, limit, offset]
+    keyset = ""
+    if cursor:
+        params.extend(util.decode_cursor(cursor, (datetime, int)))
+        params[3] = 0
+        keyset = "AND (ul.updated_at, ul.id) < ($5, $6)"
     rows = await conn.fetch(
-        """
+        f"""
             SELECT
                 m.id,
                 m.title,
@@ -91,7 +101,9 @@ async def get_mangas_by_reading_status(
                 m.cover_image_url,
                 m.created_at,
                 m.updated_at,
-                m.mal_url
+                m.mal_url,
+                ul.id AS library_id,
+                ul.updated_at AS library_updated_at
             FROM
                 library ul
             JOIN
@@ -102,25 +114,28 @@ async def get_mangas_by_reading_status(
                 AND m.id NOT IN (
                     SELECT manga_id FROM manga_blacklist
                 )
+                {keyset}
             ORDER BY
-                ul.updated_at DESC
+                ul.updated_at DESC, ul.id DESC
             LIMIT
                 $3
             OFFSET
                 $4
 
         """,
-        reading_status,
-        user.id,
-        limit,
-        offset
+        *params
     )
 
+    next_cursor = None
+    if rows and len(rows) == limit:
+        next_cursor = util.encode_cursor(rows[-1]['library_updated_at'], rows[-1]['library_id'])
+
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[Manga(**dict(row)) for row in rows]
+        offset=params[3],
+        results=[Manga(**dict(row)) for row in rows],
+        next_cursor=next_cursor
     )
 
 
@@ -11,9 +11,10 @@ from src.schemas.log import (
 )
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from src.schemas.general import Pagination
+from src.schemas.general import Pagination, TotalMode
 from src.monitor import get_monitor
 from src.db import get_db_pool, db_count
+from src import util
 from asyncpg import Connection
 from datetime import datetime
 from typing import Literal, Optional
@@ -157,9 +158,17 @@ async def log_and_build_response(
 async def get_logs(
     limit: int,
     offset: int,
-    conn: Connection
+    conn: Connection,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
 ) -> Pagination[Log]:
-    total: int = await db_count('logs', conn)
+    total: Optional[int] = await db_count('logs', conn, total_mode)
+    params = [limit, offset]
+    keyset = ""
+    if cursor:
+        params.extend(util.decode_cursor(cursor, (datetime, int)))
+        params[1] = 0
+        keyset = "WHERE (created_at, id) < ($3, $4)"
     rows = await conn.fetch(
         f"""
             SELECT 
@@ -174,21 +183,22 @@ async def get_logs(
                 created_at
             FROM 
                 logs
+            {keyset}
             ORDER BY 
-                created_at DESC
+                created_at DESC, id DESC
             LIMIT 
                 $1
             OFFSET 
                 $2
         """,
-        limit,
-        offset
+        *params
     )
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[Log(**dict(i)) for i in rows]
+        offset=params[1],
+        results=[Log(**dict(i)) for i in rows],
+        next_cursor=util.encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if rows and len(rows) == limit else None
     )
 
 
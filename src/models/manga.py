@@ -1,14 +1,22 @@
 from asyncpg import Connection
 from src.schemas.manga import Manga, MangaCreate, MangaUpdate
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from src.schemas.genre import Genre
 from src.schemas.manga_page import MangaPageData, MangaPageChapter, MangaCarouselItem
 from src.schemas.user import User
 from src.schemas.author import MangaAuthor
 from src.db import db_count
-from typing import Optional, Literal
+from typing import List, Optional, Literal, Tuple
 from src.exceptions import DatabaseError
+from src.cache import invalidate_tags
+from src.catalog import get_catalog
+from src.view_counter import get_view_counter
+from src.constants import Constants
+from src import util
+from datetime import datetime
+import random
 import json
+import time
 
 
 async def get_mangas(
@@ -16,7 +24,9 @@ async def get_mangas(
     offset: int,
     conn: Connection,
     q: Optional[str] = None,
-    title: Optional[str] = None
+    title: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
 ) -> Pagination[Manga]:
     base_query = """
         SELECT
@@ -41,22 +51,33 @@ async def get_mangas(
         conditions.append("title = $1")
         params.append(title)
 
-    if conditions:
+    if not conditions:
+        total = await db_count('mangas', conn, total_mode)
+    elif total_mode == 'none':
+        total = None
+    else:
+        # Filtered counts are always exact
         where_clause = "WHERE " + " AND ".join(conditions)
         total_query = f"SELECT COUNT(*) FROM mangas {where_clause}"
         total = await conn.fetchval(total_query, *params)
-        query = f"{base_query} {where_clause} ORDER BY id ASC LIMIT ${len(params)+1} OFFSET ${len(params)+2}"
-        rows = await conn.fetch(query, *params, limit, offset)
-    else:
-        total = await db_count('mangas', conn)
-        query = f"{base_query} ORDER BY id ASC LIMIT $1 OFFSET $2"
-        rows = await conn.fetch(query, limit, offset)
+
+    if cursor:
+        # Keyset: continue after the last id of the previous page
+        last_id, = util.decode_cursor(cursor, (int,))
+        params.append(last_id)
+        conditions.append(f"id > ${len(params)}")
+        offset = 0
+
+    where_clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    query = f"{base_query} {where_clause} ORDER BY id ASC LIMIT ${len(params)+1} OFFSET ${len(params)+2}"
+    rows = await conn.fetch(query, *params, limit, offset)
 
     return Pagination(
         total=total,
         limit=limit,
         offset=offset,
-        results=[Manga(**dict(r)) for r in rows]
+        results=[Manga(**dict(r)) for r in rows],
+        next_cursor=util.encode_cursor(rows[-1]['id']) if rows and len(rows) == limit else None
     )
 
 
@@ -81,10 +102,12 @@ async def get_mangas_complete(
 
     if genre_id:
         params.append(genre_id)
-        conditions.append(f"mg.genre_id = ${len(params)}")
+        conditions.append(
+            f"EXISTS (SELECT 1 FROM manga_genres mg WHERE mg.manga_id = m.id AND mg.genre_id = ${len(params)})"
+        )
 
     base_query = """
-            SELECT DISTINCT
+            SELECT
                 id,
                 title,
                 descr,
@@ -96,13 +119,11 @@ async def get_mangas_complete(
                 created_at
             FROM
                 mangas m
-            JOIN
-                manga_genres mg ON mg.manga_id = m.id
         """
     
     if conditions:
         where_clause = "WHERE " + " AND ".join(conditions)
-        total_query = f"SELECT COUNT(DISTINCT (m.*)) FROM mangas m JOIN manga_genres mg ON mg.manga_id = m.id {where_clause};"
+        total_query = f"SELECT COUNT(*) FROM mangas m {where_clause};"
         total = await conn.fetchval(total_query, *params)
         query = f"{base_query} {where_clause} ORDER BY m.title {order} LIMIT ${len(params)+1} OFFSET ${len(params)+2}"
         rows = await conn.fetch(query, *params, limit, offset)
@@ -177,6 +198,8 @@ async def create_manga(manga: MangaCreate, conn: Connection) -> Manga:
             manga.color,
             manga.mal_url
         )
+        await invalidate_tags("mangas")
+        get_catalog().upsert('manga', r['id'], r['title'])
     
     return Manga(**dict(r))
 
@@ -229,23 +252,43 @@ async def update_manga(manga: MangaUpdate, conn: Connection) -> Optional[Manga]:
         updated_data["mal_url"],
         manga.id
     )
+    await invalidate_tags("mangas", f"manga:{manga.id}")
+    if row:
+        get_catalog().upsert('manga', row['id'], row['title'])
 
     return Manga(**dict(row)) if row else None
 
 
 async def delete_manga(manga: IntId, conn: Connection) -> None:
     await conn.execute("DELETE FROM mangas WHERE id = $1", manga.id)
+    await invalidate_tags("mangas", f"manga:{manga.id}")
+    get_catalog().remove('manga', manga.id)
 
 
 async def get_popular_mangas(
     limit: int,
     offset: int,
-    conn: Connection
+    conn: Connection,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
 ):
-    total: int = await db_count("mangas", conn)
+    total: Optional[int] = await db_count("mangas", conn, total_mode)
+
+    params = [limit, offset]
+    keyset = ""
+    if cursor:
+        # (total_reads DESC, title ASC, id ASC) is not a single row
+        # comparison because of the mixed directions
+        params.extend(util.decode_cursor(cursor, (int, str, int)))
+        params[1] = 0
+        keyset = """
+            WHERE
+                mm.total_reads < $3
+                OR (mm.total_reads = $3 AND (m.title, m.id) > ($4, $5))
+        """
     
     rows = await conn.fetch(
-        """
+        f"""
            SELECT 
                 m.id,
                 m.title,
@@ -255,38 +298,55 @@ async def get_popular_mangas(
                 m.color,
                 m.updated_at,
                 m.created_at,
-                m.mal_url
+                m.mal_url,
+                mm.total_reads
             FROM 
                 mangas m
             JOIN 
                 manga_metrics mm ON mm.manga_id = m.id
+            {keyset}
             ORDER BY 
-                mm.total_reads DESC, m.title ASC
+                mm.total_reads DESC, m.title ASC, m.id ASC
             LIMIT
                 $1
             OFFSET
                 $2
         """,
-        limit,
-        offset
+        *params
     )
 
+    next_cursor = None
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        next_cursor = util.encode_cursor(last['total_reads'], last['title'], last['id'])
+
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[Manga(**dict(row)) for row in rows]
+        offset=params[1],
+        results=[Manga(**dict(row)) for row in rows],
+        next_cursor=next_cursor
     )
 
 
 async def get_latest_mangas(
     limit: int,
     offset: int,
-    conn: Connection
+    conn: Connection,
+    cursor: Optional[str] = None,
+    total_mode: TotalMode = 'exact'
 ) -> Pagination[Manga]:
-    total: int = await db_count('mangas', conn)
+    total: Optional[int] = await db_count('mangas', conn, total_mode)
+
+    params = [limit, offset]
+    keyset = ""
+    if cursor:
+        params.extend(util.decode_cursor(cursor, (datetime, int)))
+        params[1] = 0
+        keyset = "WHERE (updated_at, id) < ($3, $4)"
+
     rows = await conn.fetch(
-        """
+        f"""
             SELECT
                 id,
                 title,
@@ -299,57 +359,99 @@ async def get_latest_mangas(
                 created_at
             FROM
                 mangas
+            {keyset}
             ORDER BY
-                updated_at DESC
+                updated_at DESC, id DESC
             LIMIT
                 $1
             OFFSET
                 $2
         """,
-        limit,
-        offset
+        *params
     )
 
     return Pagination(
         total=total,
         limit=limit,
-        offset=offset,
-        results=[Manga(**dict(row)) for row in rows]
+        offset=params[1],
+        results=[Manga(**dict(row)) for row in rows],
+        next_cursor=util.encode_cursor(rows[-1]['updated_at'], rows[-1]['id']) if rows and len(rows) == limit else None
     )
 
 
+def sample_manga_ids(
+    limit: int,
+    offset: int,
+    seed: Optional[int],
+    cursor: Optional[str],
+    default_seed: int
+) -> Tuple[List[int], int, int, Optional[str]]:
+    """
+    Page of a seeded random order of the manga ids in the catalog index.
+    The cursor carries (seed, next offset, fingerprint of the id set) so the
+    following pages keep the same order. The order is a permutation of the
+    current ids: once they change (a manga added or removed, or a worker
+    whose index is behind) the cursor is refused with a 409 instead of
+    paging through a different order, and the client starts over.
+    Returns (ids, offset, total, next_cursor).
+    """
+    catalog = get_catalog()
+    fingerprint = catalog.fingerprint('manga')
+    if cursor:
+        seed, offset, cursor_fingerprint = util.decode_cursor(cursor, (int, int, int))
+        if offset < 0:
+            raise DatabaseError(detail="invalid cursor", code=400)
+        if cursor_fingerprint != fingerprint:
+            raise DatabaseError(detail="the catalog changed, restart from the first page", code=409)
+    if seed is None:
+        seed = default_seed
+
+    ids = catalog.sample('manga', seed, offset, limit)
+    total = len(catalog.ids('manga'))
+    next_cursor = util.encode_cursor(seed, offset + limit, fingerprint) if ids and offset + limit < total else None
+    return ids, offset, total, next_cursor
+
+
+def rotation_seed() -> int:
+    """Seed shared by every client during one CAROUSEL_ROTATION_SECONDS window."""
+    return int(time.time() // Constants.CAROUSEL_ROTATION_SECONDS)
+
+
 async def get_random_mangas(
     limit: int,
-    conn: Connection
+    conn: Connection,
+    seed: Optional[int] = None,
+    cursor: Optional[str] = None
 ) -> Pagination[Manga]:
-    total = await db_count('mangas', conn)
+    ids, offset, total, next_cursor = sample_manga_ids(limit, 0, seed, cursor, random.getrandbits(32))
     rows = await conn.fetch(
         """
             SELECT
-                id,
-                title,
-                descr,
-                status,
-                cover_image_url,
-                mal_url,
-                color,
-                updated_at,
-                created_at
+                m.id,
+                m.title,
+                m.descr,
+                m.status,
+                m.cover_image_url,
+                m.mal_url,
+                m.color,
+                m.updated_at,
+                m.created_at
             FROM
-                mangas
+                UNNEST($1::BIGINT[]) WITH ORDINALITY AS s(id, n)
+            JOIN
+                mangas m ON m.id = s.id
             ORDER BY
-                RANDOM()
-            LIMIT
-                $1
+                s.n
         """,
-        limit
+        ids
     )
 
     return Pagination(
         total=total,
         limit=limit,
-        offset=0,
-        results=[Manga(**dict(row)) for row in rows]
+        offset=offset,
+        results=[Manga(**dict(row)) for row in rows],
+        next_cursor=next_cursor
     )
 
 
@@ -421,6 +523,7 @@ async def update_cover_image_url(manga_id: int, cover_image_url: str, conn: Conn
         cover_image_url,
         manga_id
     )
+    await invalidate_tags("mangas", f"manga:{manga_id}")
 
 
 async def get_manga_page_data(manga_id: int, user: Optional[User], conn: Connection) -> MangaPageData:
@@ -432,17 +535,7 @@ async def get_manga_page_data(manga_id: int, user: Optional[User], conn: Connect
     if not row:
         raise DatabaseError(f"manga with id {manga_id} has no data", code=404)
     
-    await conn.execute(
-        """
-            UPDATE
-                manga_metrics
-            SET
-                total_reads = total_reads + 1
-            WHERE
-                manga_id = $1
-        """,
-        manga_id
-    )
+    get_view_counter().increment(manga_id)
 
     chapters = json.loads(row['chapters'])
     genres = json.loads(row['genres'])
@@ -486,24 +579,27 @@ async def get_manga_page_data(manga_id: int, user: Optional[User], conn: Connect
     )
 
 
-async def get_mangas_page_data(limit: int, offset: int, conn: Connection) -> Pagination[MangaPageData]:
-    total: int = await db_count("manga_page_view", conn)
+async def get_mangas_page_data(
+    limit: int,
+    offset: int,
+    conn: Connection,
+    seed: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Pagination[MangaPageData]:
+    ids, offset, total, next_cursor = sample_manga_ids(limit, offset, seed, cursor, rotation_seed())
 
     rows = await conn.fetch(
         """
             SELECT
-                *
+                v.*
             FROM
-                manga_page_view
+                UNNEST($1::BIGINT[]) WITH ORDINALITY AS s(id, n)
+            JOIN
+                manga_page_view v ON v.id = s.id
             ORDER BY
-                RANDOM()
-            LIMIT
-                $1
-            OFFSET
-                $2
+                s.n
         """,
-        limit,
-        offset
+        ids
     )
 
     results = []
@@ -538,28 +634,32 @@ async def get_mangas_page_data(limit: int, offset: int, conn: Connection) -> Pag
         total=total,
         limit=limit,
         offset=offset,
-        results=results
+        results=results,
+        next_cursor=next_cursor
     )
 
 
-async def get_manga_carousel_list(limit: int, offset: int, conn: Connection) -> Pagination[MangaCarouselItem]:
-    total: int = await db_count("manga_page_view", conn)
+async def get_manga_carousel_list(
+    limit: int,
+    offset: int,
+    conn: Connection,
+    seed: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Pagination[MangaCarouselItem]:
+    ids, offset, total, next_cursor = sample_manga_ids(limit, offset, seed, cursor, rotation_seed())
 
     rows = await conn.fetch(
         """
             SELECT
-                *
+                v.*
             FROM
-                manga_page_view
+                UNNEST($1::BIGINT[]) WITH ORDINALITY AS s(id, n)
+            JOIN
+                manga_page_view v ON v.id = s.id
             ORDER BY
-                RANDOM()
-            LIMIT
-                $1
-            OFFSET
-                $2
+                s.n
         """,
-        limit,
-        offset
+        ids
     )
 
     results = []
@@ -590,9 +690,12 @@ async def get_manga_carousel_list(limit: int, offset: int, conn: Connection) ->
         total=total,
         limit=limit,
         offset=offset,
-        results=results
+        results=results,
+        next_cursor=next_cursor
     )
 
 
 async def refresh_manga_page_view(conn: Connection) -> None:
-    await conn.execute("SELECT perform_refresh_manga_page_view()")
\ No newline at end of file
+    # manga_pages is kept up to date by triggers; this full pass only rewrites
+    # pages that drifted (e.g. writes made with triggers disabled)
+    await conn.execute("SELECT refresh_manga_pages(NULL)")
\ No newline at end of file
@@ -2,6 +2,8 @@ from src.schemas.manga_blacklist import BlackListMangaCreate, BlackListManga
 from src.schemas.general import Pagination, IntId
 from asyncpg import Connection
 from src.db import db_count
+from src.catalog import get_catalog
+from src.cache import invalidate_tags
 
 
 async def get_mangas_in_blacklist(
@@ -38,7 +40,7 @@ async def get_mangas_in_blacklist(
 
 
 async def add_manga_to_blacklist(blacklist_manga: BlackListMangaCreate, conn: Connection):
-    row = await conn.execute(
+    row = await conn.fetchrow(
         """
             INSERT INTO manga_blacklist (
                 manga_id,
@@ -59,6 +61,8 @@ async def add_manga_to_blacklist(blacklist_manga: BlackListMangaCreate, conn: Co
         blacklist_manga.descr
     )
 
+    await invalidate_tags("mangas", f"manga:{blacklist_manga.manga_id}")
+    get_catalog().remove('manga', blacklist_manga.manga_id)
     return BlackListManga(**dict(row))
 
 
@@ -71,4 +75,8 @@ async def remove_manga_from_blacklist(manga: IntId, conn: Connection):
                 manga_id = $1
         """,
         manga.id
-    )
\ No newline at end of file
+    )
+    await invalidate_tags("mangas", f"manga:{manga.id}")
+    title = await conn.fetchval("SELECT title FROM mangas WHERE id = $1", manga.id)
+    if title is not None:
+        get_catalog().upsert('manga', manga.id, title)
@@ -0,0 +1,158 @@
+from asyncpg import Connection
+from src.schemas.manga import MangaSearchResult
+from src.schemas.general import Pagination, TotalMode
+from src.db import db_count
+from typing import List, Literal, Optional
+
+
+# Weight of each field in the final score. A title match always outranks
+# the same match on an author name, which outranks one in the description.
+TITLE_WEIGHT = 1.0
+AUTHOR_WEIGHT = 0.8
+DESCR_WEIGHT = 0.4
+
+
+MANGA_COLUMNS = """
+    m.id,
+    m.title,
+    m.descr,
+    m.cover_image_url,
+    m.status,
+    m.color,
+    m.updated_at,
+    m.created_at,
+    m.mal_url
+"""
+
+
+def genre_filter(genre_mode: Literal['all', 'any'], param: str) -> str:
+    """
+    'all': the manga has every genre in the array (array containment).
+    'any': the manga has at least one of them (EXISTS, no DISTINCT join).
+    """
+    if genre_mode == 'all':
+        return f"""
+            ARRAY(
+                SELECT mg.genre_id FROM manga_genres mg WHERE mg.manga_id = m.id
+            ) @> {param}::BIGINT[]
+        """
+    return f"""
+        EXISTS (
+            SELECT 1 FROM manga_genres mg
+            WHERE mg.manga_id = m.id AND mg.genre_id = ANY({param}::BIGINT[])
+        )
+    """
+
+
+async def search_mangas(
+    q: Optional[str],
+    genre_ids: List[int],
+    genre_mode: Literal['all', 'any'],
+    limit: int,
+    offset: int,
+    conn: Connection,
+    total_mode: TotalMode = 'exact'
+) -> Pagination[MangaSearchResult]:
+    """
+    Ranked search over titles, author names and descriptions.
+
+    Each source is an independent candidate lookup served by its own trigram
+    GIN index (`%` / `<%` plus a substring ILIKE for short queries). The
+    candidates are merged keeping the best weighted score per manga, then
+    the genre filter and the ordering run on that small set.
+    """
+    q = q.strip() if q else None
+    genre_ids = sorted(set(genre_ids))
+
+    params: list = []
+    conditions = []
+    if genre_ids:
+        params.append(genre_ids)
+        conditions.append(genre_filter(genre_mode, f"${len(params)}"))
+
+    if q:
+        params.append(q)
+        q_param = f"${len(params)}"
+        params.append(f"%{q}%")
+        like_param = f"${len(params)}"
+        source = f"""
+            (
+                SELECT id, MAX(score) AS score
+                FROM (
+                    SELECT
+                        m.id,
+                        similarity(m.title, {q_param}) * {TITLE_WEIGHT} AS score
+                    FROM
+                        mangas m
+                    WHERE
+                        m.title % {q_param} OR m.title ILIKE {like_param}
+
+                    UNION ALL
+
+                    SELECT
+                        ma.manga_id,
+                        similarity(a.name, {q_param}) * {AUTHOR_WEIGHT}
+                    FROM
+                        authors a
+                    JOIN
+                        manga_authors ma ON ma.author_id = a.id
+                    WHERE
+                        a.name % {q_param} OR a.name ILIKE {like_param}
+
+                    UNION ALL
+
+                    SELECT
+                        m.id,
+                        word_similarity({q_param}, m.descr) * {DESCR_WEIGHT}
+                    FROM
+                        mangas m
+                    WHERE
+                        {q_param} <% m.descr
+                ) hits
+                GROUP BY id
+            ) s
+            JOIN mangas m ON m.id = s.id
+        """
+        score = "s.score"
+        order = "s.score DESC, m.title ASC, m.id ASC"
+    else:
+        source = "mangas m"
+        score = "0.0"
+        order = "m.title ASC, m.id ASC"
+
+    where_clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    if total_mode == 'none':
+        total = None
+    elif not q and not genre_ids:
+        total = await db_count('mangas', conn, total_mode)
+    else:
+        # Filtered counts are always exact
+        total = await conn.fetchval(f"SELECT COUNT(*) FROM {source} {where_clause}", *params)
+
+    rows = await conn.fetch(
+        f"""
+            SELECT
+                {MANGA_COLUMNS},
+                {score} AS score
+            FROM
+                {source}
+            {where_clause}
+            ORDER BY
+                {order}
+            LIMIT
+                ${len(params) + 1}
+            OFFSET
+                ${len(params) + 2}
+        """,
+        *params,
+        limit,
+        offset
+    )
+
+    return Pagination(
+        total=total,
+        limit=limit,
+        offset=offset,
+        results=[MangaSearchResult(**dict(r)) for r in rows]
+    )
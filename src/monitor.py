@@ -87,6 +87,8 @@ class SystemMonitor:
         self.memory_history = RollingMetrics(history_size)
         self.cpu_history = RollingMetrics(history_size)
         self.response_times = RollingMetrics(min(history_size, 1000))  # Últimas 1000 requests
+        # Duração (ms) das execuções de cada tarefa periódica
+        self.task_durations: Dict[str, RollingMetrics] = {}
         
         # Cache para evitar leituras excessivas
         self._cache = {}
@@ -319,7 +321,8 @@ class SystemMonitor:
             "memory": self.get_memory_info(),
             "cpu": self.get_cpu_info(),
             "disk": self.get_disk_info(),
-            "network": self.get_network_info()
+            "network": self.get_network_info(),
+            "tasks": self.get_task_info()
         }
     
     def increment_request(self, response_time_ms: Optional[float] = None):
@@ -335,6 +338,20 @@ class SystemMonitor:
         if response_time_ms is not None:
             self.response_times.add(response_time_ms)
     
+    def record_task(self, name: str, duration_ms: float):
+        """Registra a duração de uma execução da tarefa periódica `name`"""
+        with self._lock:
+            history = self.task_durations.get(name)
+            if history is None:
+                history = self.task_durations[name] = RollingMetrics(100)
+        history.add(duration_ms)
+
+    def get_task_info(self) -> Dict:
+        """Estatísticas de duração (ms) por tarefa periódica"""
+        with self._lock:
+            tasks = dict(self.task_durations)
+        return {name: history.get_stats() for name, history in tasks.items()}
+
     def increment_error(self):
         """Incrementa contador de erros"""
         with self._lock:
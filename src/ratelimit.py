@@ -0,0 +1,70 @@
+from dataclasses import dataclass
+from src.cache_backends import get_cache_backend, MemoryBackend, CacheBackendError
+from src.constants import Constants
+from typing import Dict, NamedTuple
+import math
+import time
+
+
+class RateLimitResult(NamedTuple):
+
+    allowed: bool
+    remaining: int
+    reset_at: float
+
+
+@dataclass(frozen=True)
+class RateLimiter:
+    """
+    Token bucket implemented as GCRA: a single "theoretical arrival time"
+    per key, updated atomically by the cache backend, allows `limit`
+    requests per `window` seconds with bursts up to `limit`. Unlike a
+    counter whose TTL is reset on every write, the bucket refills
+    continuously, so a busy client is never locked out for longer than it
+    takes to earn one request back.
+    """
+
+    name: str
+    limit: int
+    window: int
+
+    async def hit(self, key: str) -> RateLimitResult:
+        """
+        Consumes one request from the bucket of `key`.
+
+        reset_at is the unix time at which the bucket is full again when the
+        request is allowed, or at which the next request will be allowed when
+        it is rejected.
+        """
+        bucket = f"rate_limit:{self.name}:{key}"
+        try:
+            result = await get_cache_backend().gcra(bucket, self.limit, self.window)
+        except CacheBackendError as e:
+            # Fall back to per-worker counters rather than failing requests
+            print(f"[RATE LIMIT] {e}")
+            result = await _local_backend.gcra(bucket, self.limit, self.window)
+        return RateLimitResult(*result)
+
+
+_local_backend = MemoryBackend()
+
+DEFAULT_LIMITER = RateLimiter("default", Constants.MAX_REQUESTS, Constants.WINDOW)
+
+_ROUTE_LIMITERS: Dict[str, RateLimiter] = {
+    prefix: RateLimiter(prefix, limit, window)
+    for prefix, (limit, window) in Constants.RATE_LIMITS.items()
+}
+
+# Longest prefixes first so the most specific budget wins
+_ROUTE_PREFIXES = sorted(_ROUTE_LIMITERS, key=len, reverse=True)
+
+
+def get_rate_limiter(path: str) -> RateLimiter:
+    for prefix in _ROUTE_PREFIXES:
+        if path.startswith(prefix):
+            return _ROUTE_LIMITERS[prefix]
+    return DEFAULT_LIMITER
+
+
+def seconds_until_reset(reset_at: float) -> int:
+    return max(math.ceil(reset_at - time.time()), 0)
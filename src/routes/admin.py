@@ -1,7 +1,11 @@
 from fastapi import APIRouter, Depends, Query
 from fastapi.exceptions import HTTPException
 from src.security import require_admin
-from src.db import get_db
+from src.db import get_db, get_db_pool, db_count, query_stats, acquire_stats
+from src import db
+from src.cache import SizeBasedAPICache
+from src.view_counter import get_view_counter
+from src.monitor import get_monitor
 from asyncpg import Connection
 import platform
 import psutil
@@ -35,9 +39,9 @@ def admin_health():
 
 @router.get("/count")
 async def get_db_count(conn: Connection = Depends(get_db)):
-    num_mangas = await conn.fetchval("SELECT COUNT(*) FROM mangas")
-    num_chapters = await conn.fetchval("SELECT COUNT(*) FROM chapters")
-    num_chapter_images = await conn.fetchval("SELECT COUNT(*) FROM chapter_images")
+    num_mangas = await db_count("mangas", conn)
+    num_chapters = await db_count("chapters", conn)
+    num_chapter_images = await db_count("chapter_images", conn)
 
     return {
         "num_mangas": num_mangas,
@@ -46,6 +50,45 @@ async def get_db_count(conn: Connection = Depends(get_db)):
     }
 
 
+@router.get("/cache")
+def get_cache_info():
+    return SizeBasedAPICache().info()
+
+
+@router.get("/views")
+def get_view_counter_info():
+    return get_view_counter().info()
+
+
+def pool_info(pool) -> dict:
+    return {
+        "size": pool.get_size(),
+        "idle": pool.get_idle_size(),
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size()
+    }
+
+
+@router.get("/db")
+def get_db_info(limit: int = Query(default=50, ge=1, le=256)):
+    return {
+        "pool": pool_info(get_db_pool()),
+        "replica_pool": pool_info(db.db_read_pool) if db.db_read_pool is not None else None,
+        "acquire": {name: stats.info() for name, stats in acquire_stats.items()},
+        **query_stats.info(limit)
+    }
+
+
+@router.delete("/db/queries", status_code=204)
+def reset_db_query_stats():
+    query_stats.reset()
+
+
+@router.get("/tasks")
+def get_tasks_info():
+    return get_monitor().get_task_info()
+
+
 @router.get("/table/backup")
 async def get_table_backup(
     table_name: str = Query(...),
@@ -3,9 +3,10 @@ from fastapi.responses import Response
 from src.security import require_admin
 from src.schemas.chapter import ChapterImageList, ChapterImage, ChapterImageCreate, ChapterImageDelete, ChapterImageListCreate
 from src.models import chapter_images as chapter_images_model
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from src.db import get_db
 from asyncpg import Connection
+from typing import Optional
 
 
 router = APIRouter(dependencies=[Depends(require_admin)])
@@ -20,9 +21,11 @@ async def get_chapter_images(chapter: IntId, conn: Connection = Depends(get_db))
 async def get_all_chapter_images(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
     conn: Connection = Depends(get_db)
 ):
-    return await chapter_images_model.get_all_chapter_images(limit, offset, conn)
+    return await chapter_images_model.get_all_chapter_images(limit, offset, conn, cursor, total_mode)
 
 
 @router.post("/single", status_code=status.HTTP_201_CREATED)
@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, Query, status
 from src.security import require_admin
 from src.schemas.chapter import Chapter, ChapterCreate, ChapterUpdate
 from src.models import chapter as chapter_model
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from typing import Optional
 from src.db import get_db
 from asyncpg import Connection
@@ -16,9 +16,11 @@ async def get_chapters(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
     manga_id: Optional[int] = Query(default=None),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
     conn: Connection = Depends(get_db)
 ):
-    return await chapter_model.get_chapters(limit, offset, conn, manga_id)
+    return await chapter_model.get_chapters(limit, offset, conn, manga_id, cursor, total_mode)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=Chapter)
@@ -28,7 +30,7 @@ async def create_chapter(chapter: ChapterCreate, conn: Connection = Depends(get_
 
 @router.put("/", status_code=status.HTTP_201_CREATED, response_model=Chapter)
 async def update_chapter(chapter: ChapterUpdate, conn: Connection = Depends(get_db)) -> Chapter:
-    return chapter_model.update_chapter(chapter, conn)
+    return await chapter_model.update_chapter(chapter, conn)
 
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
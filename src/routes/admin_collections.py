@@ -6,12 +6,13 @@ from src.schemas.collection import (
     CollectionMangaDelete
 )
 from fastapi import APIRouter, Depends, Query, status
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from src.schemas.manga import Manga
 from src.models import collection as collection_model
 from src.security import require_admin
 from src.db import get_db
 from asyncpg import Connection
+from typing import Optional
 
 
 router = APIRouter(dependencies=[Depends(require_admin)])
@@ -22,9 +23,11 @@ router = APIRouter(dependencies=[Depends(require_admin)])
 async def get_collections(
     limit: int = Query(default=64, get=0, le=64),
     offset: int = Query(default=0, get=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
     conn: Connection = Depends(get_db)
 ) -> Pagination[Collection]:
-    return await collection_model.get_collections(limit, offset, conn)
+    return await collection_model.get_collections(limit, offset, conn, cursor, total_mode)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=Collection)
@@ -54,9 +57,10 @@ async def get_mangas_from_collection(
     collection: IntId, 
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
     conn: Connection = Depends(get_db)
 ) -> Pagination[Manga]:
-    return collection_model.get_mangas_from_collection(collection, limit, offset, conn)
+    return await collection_model.get_mangas_from_collection(collection, limit, offset, conn, cursor)
 
 
 @router.post("/mangas", status_code=status.HTTP_200_OK)
@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, Query, status
 from src.security import require_admin
 from src.schemas.log import Log, LogStats, DeletedLogs
-from src.schemas.general import Pagination
+from src.schemas.general import Pagination, TotalMode
 from src.db import get_db
 from src.models import log as log_model
 from typing import Optional, Literal
@@ -15,9 +15,11 @@ router = APIRouter(dependencies=[Depends(require_admin)])
 async def get_logs(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
     conn: Connection = Depends(get_db)
 ):
-    return await log_model.get_logs(limit, offset, conn)
+    return await log_model.get_logs(limit, offset, conn, cursor, total_mode)
 
 
 @router.get("/stats", status_code=status.HTTP_200_OK, response_model=LogStats)
@@ -5,8 +5,8 @@ from src.security import require_admin
 from src.cloudflare import CloudflareR2Bucket
 from src.schemas.manga import Manga, MangaCreate, MangaUpdate
 from src.models import manga as manga_model
-from src.schemas.general import Pagination, IntId
-from src.db import get_db
+from src.schemas.general import Pagination, IntId, TotalMode
+from src.db import get_db, LazyConnection
 from typing import Optional
 from asyncpg import Connection
 from src import util
@@ -22,9 +22,11 @@ async def get_mangas(
     offset: int = Query(default=0, ge=0),
     q: Optional[str] = Query(default=None, description="Permite buscar por um manga pelo título"),
     title: Optional[str] = Query(default=None, description='Busca pelo titulo exato'),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
     conn: Connection = Depends(get_db)
 ):
-    return await manga_model.get_mangas(limit, offset, conn, q, title)
+    return await manga_model.get_mangas(limit, offset, conn, q, title, cursor, total_mode)
 
 @router.post("/", status_code=status.HTTP_201_CREATED, response_model=Manga)
 async def create_manga(manga: MangaCreate, conn: Connection = Depends(get_db)):
@@ -41,8 +43,10 @@ async def update_manga_cover_image(
     request: Request,
     manga_id: int = Form(...),
     file: UploadFile = File(...),
-    conn: Connection = Depends(get_db)
+    conn: LazyConnection = Depends(get_db)
 ):
+    # Not needed while encoding and uploading; the UPDATE below checks out another
+    await conn.release()
     r2: CloudflareR2Bucket = request.app.state.r2
     image_key: str = f"draynor/thumbs/mangas/{util.generate_uuid()}.webp"
     image_data: io.BytesIO = await util.convert_upload_to_webp(file)
@@ -12,13 +12,14 @@ from src.schemas.token import SessionToken
 from src.security import get_user_from_token
 from src.schemas.general import Pagination, Exists
 from src.models import user as user_model
-from src.db import get_db
+from src.db import get_db, LazyConnection
 from datetime import datetime, timezone, timedelta
 from src.constants import Constants
 from asyncpg import Connection, UniqueViolationError
 from typing import Optional
 from src import security
 from src import util
+import asyncio
 
 
 
@@ -34,7 +35,7 @@ async def get_me(user: User = Depends(get_user_from_token)):
 async def login(
     user_login: UserLogin,
     request: Request,
-    conn: Connection = Depends(get_db)
+    conn: LazyConnection = Depends(get_db)
 ):
     user_login_data: Optional[UserLoginData] = await user_model.get_user_login_data(
         user_login,
@@ -49,7 +50,9 @@ async def login(
     
     print(user_login.password, user_login_data.p_hash)
     
-    if not security.verify_password(user_login.password, user_login_data.p_hash):
+    # argon2 takes a while: off the event loop and without a pool connection
+    await conn.release()
+    if not await asyncio.to_thread(security.verify_password, user_login.password, user_login_data.p_hash):
         user_login_data = await user_model.register_failed_login_attempt(user_login_data, conn)
         if user_login_data.login_attempts >= Constants.LOGIN_MAX_FAILED_ATTEMPTS:
             user_login_data.locked_until = datetime.now(timezone.utc) + timedelta(minutes=Constants.LOCK_TIME_MINUTES)
@@ -86,9 +89,9 @@ async def login(
 
 
 @router.post("/signup", status_code=status.HTTP_201_CREATED)
-async def signup(new_user: UserCreate, conn: Connection = Depends(get_db)):
+async def signup(new_user: UserCreate, conn: LazyConnection = Depends(get_db)):
     try:
-        hashed_password: bytes = security.hash_password(new_user.password)
+        hashed_password: bytes = await asyncio.to_thread(security.hash_password, new_user.password)
         await user_model.create_user(new_user, hashed_password, conn)
         return Response(status_code=status.HTTP_201_CREATED)
     except UniqueViolationError as e:
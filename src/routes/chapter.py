@@ -2,37 +2,49 @@ from fastapi import APIRouter, Depends, status, Query
 from src.schemas.chapter import MangaChapters, ChapterImageList
 from src.models import chapter as chapter_model
 from src.models import chapter_images as chapter_images_model
-from src.db import get_db
 from asyncpg import Connection
 from typing import Optional, Literal
-from src.cache import SizeBasedAPICache
+from src.cache import cached
+from src.view_counter import get_view_counter
+from src.constants import Constants
 
 
 router = APIRouter()
-cache = SizeBasedAPICache()
 
 
 @router.get("/", status_code=status.HTTP_200_OK, response_model=MangaChapters)
+@cached(
+    ttl=Constants.API_CACHE_TTL,
+    tags=["chapters", "manga:{manga_id}"],
+    cache_control=Constants.CATALOG_CACHE_CONTROL
+)
 async def get_manga_chapters_by_manga_id(
     manga_id: int = Query(...),
     limit: Optional[int] = Query(default=None, ge=0),
     order: Literal['ASC', 'DESC'] = Query(default='ASC', description='ASC or DESC'),
-    conn: Connection = Depends(get_db)
+    conn: Connection = None
 ):
-    return await cache.get_or_compute(
-        key=f"chapters:{manga_id}",
-        fetch_func=lambda: chapter_model.get_manga_chapters(manga_id, limit, order, conn),
-        response_model=MangaChapters
-    )
+    return await chapter_model.get_manga_chapters(manga_id, limit, order, conn)
 
 
-@router.get("/images", status_code=status.HTTP_200_OK, response_model=ChapterImageList)
+def record_chapter_view(chapter_id: int = Query(...)) -> None:
+    # Runs on every request, cache hits included; the manga is resolved at flush
+    get_view_counter().increment_chapter(chapter_id)
+
+
+@router.get(
+    "/images",
+    status_code=status.HTTP_200_OK,
+    response_model=ChapterImageList,
+    dependencies=[Depends(record_chapter_view)]
+)
+@cached(
+    ttl=Constants.CHAPTER_IMAGES_CACHE_TTL,
+    tags=lambda images: ["chapters", f"chapter:{images.chapter.id}", f"manga:{images.manga.id}"],
+    cache_control=Constants.CHAPTER_IMAGES_CACHE_CONTROL
+)
 async def get_chapter_images(
     chapter_id: int = Query(...),
-    conn: Connection = Depends(get_db)
+    conn: Connection = None
 ):
-    return await cache.get_or_compute(
-        key=f"images:{chapter_id}",
-        fetch_func=lambda: chapter_images_model.get_chapter_images(chapter_id, conn),
-        response_model=ChapterImageList
-    )    
\ No newline at end of file
+    return await chapter_images_model.get_chapter_images(chapter_id, conn)
\ No newline at end of file
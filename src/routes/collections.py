@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, status, Query
 from src.models import collection as collection_model
-from src.schemas.general import Pagination, IntId
+from src.schemas.general import Pagination, IntId, TotalMode
 from src.schemas.collection import Collection
 from src.schemas.manga import Manga
 from src.db import get_db
 from asyncpg import Connection
+from typing import Optional
 
 
 router = APIRouter()
@@ -14,9 +15,11 @@ router = APIRouter()
 async def get_collections(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
     conn: Connection = Depends(get_db)
 ) -> Pagination[Collection]:
-    return await collection_model.get_collections(limit, offset, conn)
+    return await collection_model.get_collections(limit, offset, conn, cursor, total_mode)
 
 
 @router.get("/mangas", status_code=status.HTTP_200_OK, response_model=Pagination[Manga])
@@ -24,6 +27,7 @@ async def get_mangas_from_collection(
     collection: IntId,
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
     conn: Connection = Depends(get_db)
 ):
-    return await collection_model.get_mangas_from_collection(collection, limit, offset, conn)
\ No newline at end of file
+    return await collection_model.get_mangas_from_collection(collection, limit, offset, conn, cursor)
\ No newline at end of file
@@ -13,6 +13,7 @@ from src.models import library as library_model
 from src.security import get_user_from_token
 from asyncpg import Connection
 from src.db import get_db
+from typing import Optional
 
 
 router = APIRouter()
@@ -23,6 +24,7 @@ async def get_mangas_by_reading_status(
     reading_status: ReadingStatusLiteral = Query(default='Reading'),
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
     user: User = Depends(get_user_from_token),
     conn: Connection = Depends(get_db)
 ):
@@ -31,7 +33,8 @@ async def get_mangas_by_reading_status(
         user, 
         limit, 
         offset, 
-        conn
+        conn,
+        cursor
     )
 
 
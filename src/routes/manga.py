@@ -1,67 +1,90 @@
-from src.schemas.manga import Manga
-from src.schemas.general import Pagination
+from src.schemas.manga import Manga, MangaSearchResult, CatalogSuggestion
+from src.schemas.general import Pagination, TotalMode
 from src.schemas.manga_page import MangaPageData, MangaCarouselItem
 from src.schemas.user import User
 from src.schemas.genre import Genre
 from src.models import genre as genre_model
 from fastapi import APIRouter, Query, Depends, status
 from src.models import manga as manga_model
-from src.db import get_db
+from src.models import search as search_model
+from src.catalog import get_catalog, CatalogKind
+from src.db import get_db, get_read_db
 from asyncpg import Connection
 from src.security import get_user_from_token_if_exists
-from typing import Optional, Literal
-from src.cache import SizeBasedAPICache
+from typing import List, Optional, Literal
+from src.cache import cached
+from src.middleware import cache_control
+from src.constants import Constants
 
 
 router = APIRouter()
-cache = SizeBasedAPICache()
 
 
 @router.get("/search")
+@cached(ttl=Constants.API_CACHE_TTL, tags=["mangas"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def get_mangas_by_title(
     q: str = Query(...),
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
+    conn: Connection = None
 ) -> Pagination[Manga]:    
-    return await cache.get_or_compute(
-        key=f"search:{q}:{limit}:{offset}",        
-        fetch_func=lambda: manga_model.get_mangas(limit, offset, conn, q),
-        response_model=Pagination[Manga]
-    )
+    return await manga_model.get_mangas(limit, offset, conn, q, cursor=cursor, total_mode=total_mode)
 
 
 @router.get("/search/complete")
+@cached(ttl=Constants.API_CACHE_TTL, tags=["mangas", "genre:{genre_id}"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def search_mangas_complete(
     title: Optional[str] = Query(default=None),
     genre_id: Optional[int] = Query(default=None),
     order: Literal['ASC', 'DESC'] = Query(default='ASC'),
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    conn: Connection = None
 ) -> Pagination[Manga]:
-    return await cache.get_or_compute(
-        key=f"search:{title}:{genre_id}:{order}:{limit}:{offset}",
-        fetch_func=lambda: manga_model.get_mangas_complete(title, genre_id, order, limit, offset, conn),
-        response_model=Pagination[Manga]
-    )    
+    return await manga_model.get_mangas_complete(title, genre_id, order, limit, offset, conn)
+
+
+@router.get("/search/ranked")
+@cached(ttl=Constants.API_CACHE_TTL, tags=["mangas", "genres", "authors"], cache_control=Constants.CATALOG_CACHE_CONTROL)
+async def search_mangas_ranked(
+    q: Optional[str] = Query(default=None, max_length=256, description='Busca por título, autor e descrição'),
+    genre_id: List[int] = Query(default=[], description='Filtra por gêneros (repetível)'),
+    genre_mode: Literal['all', 'any'] = Query(default='all', description="'all' exige todos os gêneros, 'any' ao menos um"),
+    limit: int = Query(default=64, ge=0, le=64),
+    offset: int = Query(default=0, ge=0),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
+    conn: Connection = None
+) -> Pagination[MangaSearchResult]:
+    return await search_model.search_mangas(q, genre_id, genre_mode, limit, offset, conn, total_mode)
+
+
+# Served from the in-memory catalog index, without touching the database
+@router.get("/autocomplete", dependencies=[Depends(cache_control(Constants.CATALOG_CACHE_CONTROL))])
+async def autocomplete(
+    q: str = Query(..., min_length=1, max_length=128),
+    limit: int = Query(default=10, ge=1, le=32),
+    kind: List[CatalogKind] = Query(default=[], description='manga, genre e/ou author (repetível)')
+) -> List[CatalogSuggestion]:
+    return get_catalog().search(q, limit, kind)
 
 
 @router.get("/popular", response_model=Pagination[Manga])
+@cached(tags=["mangas"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def get_most_popular_mangas(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
+    conn: Connection = None
 ) -> Pagination[Manga]:
-    
-    return await cache.get_or_compute(
-        key=f"popular:{limit}:{offset}",
-        fetch_func=lambda: manga_model.get_popular_mangas(limit, offset, conn),
-        response_model=Pagination[Manga]
-    )
+    return await manga_model.get_popular_mangas(limit, offset, conn, cursor, total_mode)
 
 
-@router.get("/page")
+# Personalized for logged-in users: revalidated with the ETag on every visit.
+# Stays on the primary so a reading status change shows up right away
+@router.get("/page", dependencies=[Depends(cache_control("private, no-cache"))])
 async def get_manga_page_data(
     manga_id: int = Query(...), 
     user: Optional[User] = Depends(get_user_from_token_if_exists),
@@ -71,65 +94,54 @@ async def get_manga_page_data(
 
 
 @router.get("/page/list")
+@cached(ttl=300, tags=["mangas", "genres", "authors"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def get_mangas_page_data(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    seed: Optional[int] = Query(default=None, description='Semente da ordem aleatória; a mesma semente repete a ordem'),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    conn: Connection = None
 ) -> Pagination[MangaCarouselItem]:
-    
-    return await cache.get_or_compute(
-        key=f"page_list:{limit}:{offset}",
-        fetch_func=lambda: manga_model.get_manga_carousel_list(limit, offset, conn),
-        response_model=Pagination[MangaCarouselItem],
-        ttl=300
-    )
+    return await manga_model.get_manga_carousel_list(limit, offset, conn, seed, cursor)
     
 
 @router.get("/latest", response_model=Pagination[Manga])
+@cached(ttl=Constants.API_CACHE_TTL, tags=["mangas"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def get_latest_mangas(
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    total_mode: TotalMode = Query(default='exact', description="'estimate' usa as estatísticas do planner, 'none' omite o total"),
+    conn: Connection = None
 ) -> Pagination[Manga]: 
-    
-    return await cache.get_or_compute(
-        key=f"latest:{limit}:{offset}",
-        fetch_func=lambda: manga_model.get_latest_mangas(limit, offset, conn),
-        response_model=Pagination[Manga],
-        ttl=300
-    )
+    return await manga_model.get_latest_mangas(limit, offset, conn, cursor, total_mode)
     
 
 @router.get("/random", status_code=status.HTTP_200_OK, response_model=Pagination[Manga])
 async def get_random_mangas(
     limit: int = Query(default=64, ge=0, le=64),
-    conn: Connection = Depends(get_db)
+    seed: Optional[int] = Query(default=None, description='Semente da ordem aleatória; a mesma semente repete a ordem'),
+    cursor: Optional[str] = Query(default=None, description='next_cursor da página anterior'),
+    conn: Connection = Depends(get_read_db)
 ) -> Pagination[Manga]:
-    return await manga_model.get_random_mangas(limit, conn)
+    return await manga_model.get_random_mangas(limit, conn, seed, cursor)
 
 
 @router.get("/genre", response_model=Pagination[Manga])
+@cached(ttl=Constants.API_CACHE_TTL, tags=["mangas", "genre:{genre_id}"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def get_manga_by_genre(
     genre_id: int = Query(...),
     limit: int = Query(default=64, ge=0, le=64),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    conn: Connection = None
 ) -> Pagination[Manga]:
-    
-    return await cache.get_or_compute(
-        key=f"genre:{genre_id}:{limit}:{offset}",
-        fetch_func=lambda: manga_model.get_manga_by_genre(genre_id, limit, offset, conn),
-        response_model=Pagination[Manga]
-    )
+    return await manga_model.get_manga_by_genre(genre_id, limit, offset, conn)
 
 @router.get("/genres", response_model=Pagination[Genre])
+@cached(ttl=Constants.API_CACHE_TTL, tags=["genres"], cache_control=Constants.CATALOG_CACHE_CONTROL)
 async def get_all_genres(
     limit: int = Query(default=256, ge=0),
     offset: int = Query(default=0, ge=0),
-    conn: Connection = Depends(get_db)
+    conn: Connection = None
 ):
-    return await cache.get_or_compute(
-        key=f"all_genres:{limit}:{offset}",
-        fetch_func=lambda: genre_model.fetch_genres(limit, offset, conn),
-        response_model=Pagination[Genre]
-    )
\ No newline at end of file
+    return await genre_model.fetch_genres(limit, offset, conn)
\ No newline at end of file
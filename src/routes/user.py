@@ -3,7 +3,7 @@ from fastapi.exceptions import HTTPException
 from src.schemas.general import Pagination, ImageUrl
 from src.schemas.user import User, UserUpdate
 from src.models import user as user_model
-from src.db import get_db
+from src.db import get_db, LazyConnection
 from src.cloudflare import CloudflareR2Bucket
 from asyncpg import Connection, UniqueViolationError
 from src import security
@@ -33,7 +33,7 @@ async def update_user_perfil_image(
     request: Request,
     file: UploadFile = File(...),
     user: User = Depends(security.get_user_from_token),
-    conn: Connection = Depends(get_db),
+    conn: LazyConnection = Depends(get_db),
 ):
     if not file.content_type.startswith("image/"):
         raise HTTPException(
@@ -41,6 +41,8 @@ async def update_user_perfil_image(
             detail=f"Invalid file type '{file.content_type}'. Only images are allowed."
         )
 
+    # Not needed while encoding and uploading; the UPDATE below checks out another
+    await conn.release()
     r2: CloudflareR2Bucket = request.app.state.r2
     image_key: str = f"draynor/users/images/perfil/{util.generate_uuid()}.webp"
     image_data: io.BytesIO = await util.convert_upload_to_webp(file)
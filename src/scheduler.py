@@ -0,0 +1,74 @@
+from asyncpg import Connection
+from src.monitor import get_monitor
+from src import db
+from typing import Awaitable, Callable
+import asyncio
+import time
+
+
+Job = Callable[[Connection], Awaitable[None]]
+
+
+async def get_catalog_version(conn: Connection) -> int:
+    return await conn.fetchval("SELECT version FROM catalog_version")
+
+
+async def run_leader_job(name: str, job: Job, conn: Connection) -> bool:
+    """
+    Runs `job` in at most one worker at a time and only if the catalog
+    changed since its last run. The transaction-scoped advisory lock keyed
+    by `name` elects the worker; the catalog_version of the last run is kept
+    in scheduled_jobs, so the workers that lose the race (or tick later in
+    the same interval) see it up to date and skip. Returns whether it ran.
+    """
+    async with conn.transaction():
+        if not await conn.fetchval("SELECT pg_try_advisory_xact_lock(hashtext($1))", name):
+            return False
+
+        version = await get_catalog_version(conn)
+        last_version = await conn.fetchval(
+            "SELECT catalog_version FROM scheduled_jobs WHERE name = $1",
+            name
+        )
+        if last_version == version:
+            return False
+
+        start = time.perf_counter()
+        await job(conn)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        await conn.execute(
+            """
+                INSERT INTO scheduled_jobs (
+                    name,
+                    catalog_version,
+                    last_run_at,
+                    last_duration_ms
+                )
+                VALUES
+                    ($1, $2, CURRENT_TIMESTAMP, $3)
+                ON CONFLICT
+                    (name)
+                DO UPDATE SET
+                    catalog_version = EXCLUDED.catalog_version,
+                    last_run_at = EXCLUDED.last_run_at,
+                    last_duration_ms = EXCLUDED.last_duration_ms
+            """,
+            name,
+            version,
+            duration_ms
+        )
+
+    get_monitor().record_task(name, duration_ms)
+    return True
+
+
+async def periodic_leader_job(name: str, interval: float, job: Job):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with db.acquire() as conn:
+                if await run_leader_job(name, job, conn):
+                    print(f"[INFO] {name} executado")
+        except Exception as e:
+            print(f"[ERROR] Erro ao executar {name}: {e}")
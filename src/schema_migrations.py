@@ -0,0 +1,114 @@
+"""
+Versioned schema migrations.
+
+Migrations are the files db/migrations/NNNN_<name>.sql, applied once each,
+in order, every one in its own transaction, and recorded in the
+schema_migrations table. A startup with nothing pending costs one query.
+
+    python -m src.schema_migrations
+"""
+from asyncpg import Connection
+from asyncpg.exceptions import UndefinedTableError
+from src.exceptions import MigrationError
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import List, Tuple
+import asyncpg
+import asyncio
+import time
+import os
+import re
+
+
+MIGRATIONS_DIR = Path("db/migrations")
+
+# pg_advisory_lock key held while migrations are applied
+MIGRATIONS_LOCK_ID = 72_616_001
+
+
+def list_migrations(directory: Path = MIGRATIONS_DIR) -> List[Tuple[int, str, Path]]:
+    migrations = []
+    for file in sorted(directory.glob("*.sql")):
+        match = re.fullmatch(r"(\d+)_(\w+)\.sql", file.name)
+        if not match:
+            raise MigrationError(f"invalid migration file name: {file.name}")
+        migrations.append((int(match.group(1)), match.group(2), file))
+
+    versions = [version for version, _, _ in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f"duplicated migration versions in {directory}")
+    return sorted(migrations)
+
+
+async def current_version(conn: Connection) -> int:
+    try:
+        return await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    except UndefinedTableError:
+        return 0
+
+
+async def migrate(conn: Connection, directory: Path = MIGRATIONS_DIR) -> List[int]:
+    """
+    Applies the pending migrations and returns their versions. Concurrent
+    callers (one per worker) wait on the advisory lock and then find nothing
+    left to do. Errors are raised: a failed migration is rolled back and
+    stops the startup.
+    """
+    migrations = list_migrations(directory)
+    latest = migrations[-1][0] if migrations else 0
+
+    # Fast path: up to date, no lock needed
+    if await current_version(conn) >= latest:
+        return []
+
+    applied: List[int] = []
+    await conn.execute("SELECT pg_advisory_lock($1)", MIGRATIONS_LOCK_ID)
+    try:
+        await conn.execute(
+            """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    duration_ms DOUBLE PRECISION NOT NULL
+                )
+            """
+        )
+        done = {r['version'] for r in await conn.fetch("SELECT version FROM schema_migrations")}
+
+        for version, name, file in migrations:
+            if version in done:
+                continue
+            sql = file.read_text(encoding="utf-8")
+            start = time.perf_counter()
+            try:
+                async with conn.transaction():
+                    await conn.execute(sql)
+                    await conn.execute(
+                        "INSERT INTO schema_migrations (version, name, duration_ms) VALUES ($1, $2, $3)",
+                        version,
+                        name,
+                        (time.perf_counter() - start) * 1000
+                    )
+            except Exception as e:
+                raise MigrationError(f"migration {file.name} failed: {e}") from e
+            print(f"[MIGRATIONS] applied {file.name} ({(time.perf_counter() - start) * 1000:.0f} ms)")
+            applied.append(version)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATIONS_LOCK_ID)
+
+    return applied
+
+
+async def main():
+    load_dotenv()
+    conn = await asyncpg.connect(os.getenv("DATABASE_URL"))
+    try:
+        applied = await migrate(conn)
+        print(f"[MIGRATIONS] {len(applied)} applied, schema at version {await current_version(conn)}")
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
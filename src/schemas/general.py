@@ -1,23 +1,29 @@
 from pydantic import BaseModel, model_validator, HttpUrl
-from typing import Generic, TypeVar, List, Optional
+from typing import Generic, TypeVar, List, Literal, Optional
 
 
 T = TypeVar("T", bound=BaseModel)
 
+# How a Pagination total is obtained, see db.db_count
+TotalMode = Literal['exact', 'estimate', 'none']
+
 
 class Pagination(BaseModel, Generic[T]):
 
-    total: int
+    total: Optional[int]
     limit: int
     offset: int
     page: Optional[int] = None
     pages: Optional[int] = None
     results: List[T]
+    # Keyset cursor for the next page, when the endpoint accepts `cursor`
+    next_cursor: Optional[str] = None
 
     @model_validator(mode="after")
     def compute_pages(self):
         self.page = (self.offset // self.limit) + 1
-        self.pages = (self.total + self.limit - 1) // self.limit
+        if self.total is not None:
+            self.pages = (self.total + self.limit - 1) // self.limit
         return self
 
 
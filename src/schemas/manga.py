@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 
 class Manga(BaseModel):
@@ -16,6 +16,18 @@ class Manga(BaseModel):
     mal_url: Optional[str] = None
 
 
+class MangaSearchResult(Manga):
+
+    score: float
+
+
+class CatalogSuggestion(BaseModel):
+
+    kind: Literal['manga', 'genre', 'author']
+    id: int
+    name: str
+
+
 class MangaCreate(BaseModel):
 
     title: str
@@ -3,13 +3,19 @@ from pathlib import Path
 from asyncpg import Connection
 from datetime import datetime, timezone
 from src.schemas.general import ClientInfo
-from typing import Optional, Any
+from src.exceptions import DatabaseError
+from src.constants import Constants
+from typing import Optional, Any, List, Tuple
 from PIL import Image
 from threading import Lock
 from functools import wraps
 from io import BytesIO
 from PIL import Image
+import asyncio
 import colorsys
+import base64
+import binascii
+import json
 import unicodedata
 import requests
 import uuid
@@ -74,12 +80,50 @@ def coalesce(a: Optional[Any], b: Optional[Any]) -> Optional[Any]:
     return b
 
 
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque keyset pagination cursor holding the sort key values of the last
+    row of a page (datetimes included).
+    """
+    raw = json.dumps(
+        [{"$dt": v.isoformat()} if isinstance(v, datetime) else v for v in values],
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _is_cursor_value(value: Any, kind: type) -> bool:
+    if kind is int:
+        # bool is an int too; anything beyond BIGINT would fail in the query
+        return type(value) is int and -2**63 <= value < 2**63
+    return isinstance(value, kind)
+
+
+def decode_cursor(cursor: str, types: Tuple[type, ...]) -> List[Any]:
+    """
+    Values of a cursor made by encode_cursor, checked against the `types` of
+    the sort key they are compared with: a malformed cursor is a 400, not an
+    error from the query.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw, object_hook=lambda o: datetime.fromisoformat(o["$dt"]))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(types)
+        or not all(_is_cursor_value(v, kind) for v, kind in zip(values, types))
+    ):
+        raise DatabaseError(detail="invalid cursor", code=400)
+    return values
+
+
 def generate_uuid() -> str:
     return str(uuid.uuid4())
 
 
-async def convert_upload_to_webp(file: UploadFile, quality: int = 80) -> io.BytesIO:
-    contents = await file.read()
+def encode_webp(contents: bytes, quality: int = 80) -> io.BytesIO:
     image = Image.open(io.BytesIO(contents))
 
     buffer = io.BytesIO()
@@ -89,6 +133,17 @@ async def convert_upload_to_webp(file: UploadFile, quality: int = 80) -> io.Byte
     return buffer
 
 
+_webp_semaphore = asyncio.Semaphore(Constants.IMAGE_ENCODE_CONCURRENCY)
+
+
+async def convert_upload_to_webp(file: UploadFile, quality: int = 80) -> io.BytesIO:
+    contents = await file.read()
+    # method=6 costs from hundreds of ms to seconds of CPU: run it in a thread
+    # so the event loop keeps serving other requests, a few at a time
+    async with _webp_semaphore:
+        return await asyncio.to_thread(encode_webp, contents, quality)
+
+
 def download_resize_to_webp(url: str, output_path: str, max_width: int = 720) -> Path:
     resp = requests.get(url, timeout=20)
     resp.raise_for_status()
@@ -138,13 +193,16 @@ def normalize_dirname(name: str) -> str:
     return name
 
 
-def normalize_to_url(text: str) -> str:    
-    # unicode normalize
+def fold_text(text: str) -> str:
+    """Accent-folded, lowercase text ("Pokémon Adventures" -> "pokemon adventures")."""
     text = unicodedata.normalize("NFKD", text)
     text = "".join(c for c in text if not unicodedata.combining(c))
+    return text.lower()
 
-    # lowercase
-    text = text.lower()
+
+def normalize_to_url(text: str) -> str:    
+    # unicode normalize + lowercase
+    text = fold_text(text)
 
     # replace invalid characters with '-'
     text = re.sub(r"[^a-z0-9\-._~]", "-", text)
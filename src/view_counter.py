@@ -0,0 +1,169 @@
+from asyncpg import Connection
+from src.constants import Constants
+from src import db
+from typing import Dict, Optional
+import asyncio
+import time
+
+
+class ViewCounter:
+    """
+    Write-behind aggregation of manga_metrics.total_reads.
+
+    Requests only bump an in-process counter, per manga_id or per
+    chapter_id when the request does not know its manga (chapter images are
+    served from cache); flush() applies everything accumulated since the
+    previous flush in a single UPDATE, resolving chapters to their manga in
+    SQL, so a popular manga costs one row update per interval instead of one
+    per view. Increments of a failed flush are kept for the next one; the
+    pending ids are capped at VIEW_COUNTER_MAX_PENDING so they can't grow
+    without bound while the database is down.
+    """
+
+    def __init__(self):
+        self.pending: Dict[int, int] = {}
+        self.pending_chapters: Dict[int, int] = {}
+        self.flushes = 0
+        self.flushed_views = 0
+        self.failed_flushes = 0
+        self.dropped_views = 0
+        self.last_flush_at: Optional[float] = None
+        self.last_flush_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _add(self, pending: Dict[int, int], item_id: int, n: int) -> None:
+        # Ids come from query params: one beyond BIGINT would fail every flush
+        if item_id not in pending and (
+            len(pending) >= Constants.VIEW_COUNTER_MAX_PENDING
+            or not 0 < item_id < 2**63
+        ):
+            self.dropped_views += n
+            return
+        pending[item_id] = pending.get(item_id, 0) + n
+
+    def increment(self, manga_id: int, n: int = 1) -> None:
+        self._add(self.pending, manga_id, n)
+
+    def increment_chapter(self, chapter_id: int, n: int = 1) -> None:
+        self._add(self.pending_chapters, chapter_id, n)
+
+    async def flush(self, conn: Connection) -> int:
+        if not self.pending and not self.pending_chapters:
+            return 0
+
+        # Swapped before the first await: increments made during the UPDATE
+        # go to the next batch
+        batch, self.pending = self.pending, {}
+        chapter_batch, self.pending_chapters = self.pending_chapters, {}
+        manga_ids = sorted(batch)
+        views = [batch[manga_id] for manga_id in manga_ids]
+        chapter_ids = sorted(chapter_batch)
+        chapter_views = [chapter_batch[chapter_id] for chapter_id in chapter_ids]
+
+        start = time.perf_counter()
+        try:
+            async with conn.transaction():
+                # ORDER BY in the UPDATE's FROM doesn't decide in which order
+                # the planner locks manga_metrics: lock the rows in manga_id
+                # order first, so concurrent flushes of the workers can't deadlock
+                await conn.execute(
+                    """
+                        SELECT
+                            1
+                        FROM
+                            manga_metrics
+                        WHERE
+                            manga_id IN (
+                                SELECT UNNEST($1::BIGINT[])
+                                UNION
+                                SELECT manga_id FROM chapters WHERE id = ANY($2::BIGINT[])
+                            )
+                        ORDER BY
+                            manga_id
+                        FOR UPDATE
+                    """,
+                    manga_ids,
+                    chapter_ids
+                )
+                await conn.execute(
+                    """
+                        UPDATE
+                            manga_metrics mm
+                        SET
+                            total_reads = mm.total_reads + v.views
+                        FROM (
+                            SELECT
+                                manga_id,
+                                SUM(views) AS views
+                            FROM (
+                                SELECT manga_id, views FROM UNNEST($1::BIGINT[], $2::INT[]) AS m(manga_id, views)
+                                UNION ALL
+                                SELECT
+                                    c.manga_id,
+                                    cv.views
+                                FROM
+                                    UNNEST($3::BIGINT[], $4::INT[]) AS cv(chapter_id, views)
+                                JOIN
+                                    chapters c ON c.id = cv.chapter_id
+                            ) all_views
+                            GROUP BY
+                                manga_id
+                        ) v
+                        WHERE
+                            mm.manga_id = v.manga_id
+                    """,
+                    manga_ids,
+                    views,
+                    chapter_ids,
+                    chapter_views
+                )
+        except Exception as e:
+            for manga_id, n in batch.items():
+                self.increment(manga_id, n)
+            for chapter_id, n in chapter_batch.items():
+                self.increment_chapter(chapter_id, n)
+            self.failed_flushes += 1
+            self.last_error = str(e)
+            raise
+
+        self.flushes += 1
+        self.flushed_views += sum(views) + sum(chapter_views)
+        self.last_flush_at = time.time()
+        self.last_flush_ms = round((time.perf_counter() - start) * 1000, 3)
+        return len(manga_ids) + len(chapter_ids)
+
+    def info(self) -> dict:
+        return {
+            "pending_mangas": len(self.pending),
+            "pending_chapters": len(self.pending_chapters),
+            "pending_views": sum(self.pending.values()) + sum(self.pending_chapters.values()),
+            "flushes": self.flushes,
+            "flushed_views": self.flushed_views,
+            "failed_flushes": self.failed_flushes,
+            "dropped_views": self.dropped_views,
+            "last_flush_at": self.last_flush_at,
+            "last_flush_ms": self.last_flush_ms,
+            "last_error": self.last_error,
+            "flush_interval": Constants.VIEW_COUNTER_FLUSH_INTERVAL
+        }
+
+
+view_counter = ViewCounter()
+
+
+def get_view_counter() -> ViewCounter:
+    return view_counter
+
+
+async def flush_views() -> None:
+    async with db.acquire() as conn:
+        await view_counter.flush(conn)
+
+
+async def periodic_view_flush():
+    while True:
+        await asyncio.sleep(Constants.VIEW_COUNTER_FLUSH_INTERVAL)
+        try:
+            await flush_views()
+        except Exception as e:
+            print(f"[ERROR] Erro ao gravar as visualizações em manga_metrics: {e}")
@@ -0,0 +1,139 @@
+"""
+Read routing between the primary and the replica pool, against two real
+servers: TEST_DATABASE_URL (primary) and TEST_DATABASE_REPLICA_URL, which can
+be any second Postgres standing in for the replica, e.g. a local one on
+another port. Only reads are run. Skipped when either is unset.
+
+    TEST_DATABASE_URL=postgresql://postgres@127.0.0.1:5432/postgres \\
+    TEST_DATABASE_REPLICA_URL=postgresql://postgres@127.0.0.1:5433/postgres \\
+    python -m pytest tests
+"""
+from src.cache_backends import MemoryBackend
+from src.cache import SizeBasedAPICache
+from src.constants import Constants
+from src import cache_backends
+from src import db
+import asyncpg
+import asyncio
+import pytest
+import os
+
+
+PRIMARY_URL = os.getenv("TEST_DATABASE_URL")
+REPLICA_URL = os.getenv("TEST_DATABASE_REPLICA_URL")
+
+pytestmark = pytest.mark.skipif(
+    not PRIMARY_URL or not REPLICA_URL,
+    reason="TEST_DATABASE_URL and TEST_DATABASE_REPLICA_URL not set"
+)
+
+SERVER_QUERY = "SELECT current_setting('port') || '@' || COALESCE(host(inet_server_addr()), 'socket')"
+
+
+class SharedMemoryBackend(MemoryBackend):
+    """MemoryBackend seen as shared: every worker of the test is this process."""
+
+    shared = True
+
+
+async def server_of(url: str) -> str:
+    conn = await asyncpg.connect(url)
+    try:
+        return await conn.fetchval(SERVER_QUERY)
+    finally:
+        await conn.close()
+
+
+def run(test, monkeypatch):
+    """Runs `test(primary, replica)` with both pools set up as db_init does."""
+    monkeypatch.setattr(Constants, "DB_REPLICA_STICKY_SECONDS", 0.2)
+    monkeypatch.setattr(db, "_primary_reads_until", 0.0)
+    monkeypatch.setattr(cache_backends, "_backend", SharedMemoryBackend())
+
+    async def main():
+        primary, replica = await server_of(PRIMARY_URL), await server_of(REPLICA_URL)
+        if primary == replica:
+            pytest.skip("both DSNs point to the same server")
+        db.db_pool = await db._create_pool(PRIMARY_URL)
+        db.db_read_pool = await db._create_pool(REPLICA_URL)
+        try:
+            await test(primary, replica)
+        finally:
+            await db.db_close()
+            db.db_pool = db.db_read_pool = None
+
+    asyncio.run(main())
+
+
+async def read_db_server() -> str:
+    dependency = db.get_read_db()
+    conn = await dependency.__anext__()
+    try:
+        return await conn.fetchval(SERVER_QUERY)
+    finally:
+        await dependency.aclose()
+
+
+def test_reads_go_to_the_replica(monkeypatch):
+    async def test(primary, replica):
+        replica_acquires = db.acquire_stats["replica"].acquires
+        assert await read_db_server() == replica
+        assert db.acquire_stats["replica"].acquires == replica_acquires + 1
+
+        async with db.acquire(await SizeBasedAPICache().read_pool()) as conn:
+            assert await conn.fetchval(SERVER_QUERY) == replica
+
+    run(test, monkeypatch)
+
+
+def test_primary_after_a_write_then_back_to_the_replica(monkeypatch):
+    async def test(primary, replica):
+        await SizeBasedAPICache().invalidate_tags("mangas")
+        assert await read_db_server() == primary
+        async with db.acquire(await SizeBasedAPICache().read_pool()) as conn:
+            assert await conn.fetchval(SERVER_QUERY) == primary
+
+        await asyncio.sleep(Constants.DB_REPLICA_STICKY_SECONDS + 0.1)
+        assert await read_db_server() == replica
+        assert await SizeBasedAPICache().read_pool() is db.db_read_pool
+
+    run(test, monkeypatch)
+
+
+def test_write_in_another_worker_keeps_cache_fills_on_the_primary(monkeypatch):
+    async def test(primary, replica):
+        await SizeBasedAPICache().invalidate_tags("mangas")
+        # This worker did not write: only the shared window applies
+        db._primary_reads_until = 0.0
+        assert db.get_read_pool() is db.db_read_pool
+        assert await SizeBasedAPICache().read_pool() is db.db_pool
+
+        await asyncio.sleep(Constants.DB_REPLICA_STICKY_SECONDS + 0.1)
+        assert await SizeBasedAPICache().read_pool() is db.db_read_pool
+
+    run(test, monkeypatch)
+
+
+def test_lazy_connection_keeps_one_connection_until_released(monkeypatch):
+    async def test(primary, replica):
+        dependency = db.get_db()
+        conn = await dependency.__anext__()
+        assert conn.conn is None
+
+        pid = await conn.fetchval("SELECT pg_backend_pid()")
+        assert await conn.fetchval("SELECT pg_backend_pid()") == pid
+        idle = db.db_pool.get_idle_size()
+
+        async with conn.transaction():
+            await conn.release()
+            assert await conn.fetchval("SELECT pg_backend_pid()") == pid
+
+        await conn.release()
+        assert conn.conn is None
+        assert db.db_pool.get_idle_size() == idle + 1
+
+        await conn.fetchval("SELECT 1")
+        await dependency.aclose()
+        assert conn.conn is None
+
+    run(test, monkeypatch)